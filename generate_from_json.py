@@ -51,8 +51,9 @@ def create_word_document(text: str, svg_image: Image.Image = None, output_path:
 
     # 如果有图片，添加到文档中
     if svg_image:
+        # 中间 PNG 会再被 docx 压缩打包，用最快的 deflate 级别编码一次即可
         image_stream = BytesIO()
-        svg_image.save(image_stream, format='PNG')
+        svg_image.save(image_stream, format='PNG', optimize=False, compress_level=1)
         image_stream.seek(0)
 
         paragraph = doc.add_paragraph()
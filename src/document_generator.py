@@ -21,6 +21,7 @@ from docx.oxml.ns import qn
 from PIL import Image
 
 from .tikz_renderer import TikZRenderer
+from .svg_extract import extract_svg_json_blocks
 
 try:
     import cairosvg
@@ -35,97 +36,7 @@ logger = logging.getLogger(__name__)
 class DocumentGenerator:
     """Word文档生成器类"""
 
-    # 简化的正则表达式，只用于初步定位
-    SVG_JSON_PATTERN = re.compile(
-        r'(?:【图形】\s*)?\{',
-        re.IGNORECASE
-    )
-
-    @staticmethod
-    def _extract_svg_json_blocks(text: str) -> List[tuple]:
-        """
-        提取文本中的SVG JSON块
-        返回: [(start, end, json_string), ...]
-        """
-        results = []
-        i = 0
-        while i < len(text):
-            # 寻找可能的JSON开始
-            marker_pos = text.find('【图形】', i)
-            if marker_pos != -1:
-                # 跳过【图形】后的空白，找到 {
-                j = marker_pos + 4  # len('【图形】') = 4
-                while j < len(text) and text[j].isspace():
-                    j += 1
-                if j < len(text) and text[j] == '{':
-                    start_pos = marker_pos
-                    json_start = j
-                else:
-                    i = marker_pos + 1
-                    continue
-            else:
-                # 没有标记，查找包含 "img_b64" 的 JSON
-                json_start = text.find('"img_b64"', i)
-                if json_start == -1:
-                    break
-                # 向前查找最近的 {
-                brace_pos = text.rfind('{', i, json_start)
-                if brace_pos == -1:
-                    i = json_start + 1
-                    continue
-                start_pos = brace_pos
-                json_start = brace_pos
-
-            # 从 { 开始，找到匹配的 }
-            brace_count = 0
-            in_string = False
-            escape = False
-            json_end = -1
-
-            for k in range(json_start, len(text)):
-                char = text[k]
-
-                if escape:
-                    escape = False
-                    continue
-
-                if char == '\\':
-                    escape = True
-                    continue
-
-                if char == '"':
-                    in_string = not in_string
-                    continue
-
-                if not in_string:
-                    if char == '{':
-                        brace_count += 1
-                    elif char == '}':
-                        brace_count -= 1
-                        if brace_count == 0:
-                            json_end = k + 1
-                            break
-
-            if json_end == -1:
-                # 没有找到匹配的 }
-                i = json_start + 1
-                continue
-
-            # 提取JSON字符串
-            json_str = text[json_start:json_end]
-
-            # 验证是否是SVG JSON
-            try:
-                data = json.loads(json_str)
-                if isinstance(data, dict) and 'img_b64' in data and data.get('format', '').lower() == 'svg':
-                    results.append((start_pos, json_end, json_str))
-                    i = json_end
-                else:
-                    i = json_start + 1
-            except json.JSONDecodeError:
-                i = json_start + 1
-
-        return results
+    _extract_svg_json_blocks = staticmethod(extract_svg_json_blocks)
 
     def __init__(self, config: dict):
         """
@@ -601,18 +512,24 @@ class DocumentGenerator:
 
         try:
             logger.info("Rendering TikZ figure...")
-            # 渲染TikZ图形
-            image = self.tikz_renderer.render_tikz_to_image(tikz_code)
+            # 渲染TikZ图形（SVG输出需要cairosvg在插入时按显示尺寸光栅化）
+            output_format = self.tikz_renderer.output_format
+            if output_format == 'svg' and not self.svg_converter_available:
+                output_format = 'png'
+            rendered = self.tikz_renderer.render_tikz(tikz_code, output_format=output_format)
+
+            if rendered:
+                fmt, data = rendered
+                width = self.doc_config.get('image_width_inches', 6.0)
 
-            if image:
-                # 保存图片到BytesIO
-                img_buffer = BytesIO()
-                image.save(img_buffer, format='PNG')
-                img_buffer.seek(0)
+                if fmt == 'svg':
+                    data = cairosvg.svg2png(
+                        bytestring=data,
+                        output_width=int(width * self.tikz_renderer.convert_dpi)
+                    )
 
-                # 添加图片到文档
-                width = self.doc_config.get('image_width_inches', 6.0)
-                doc.add_picture(img_buffer, width=Inches(width))
+                # PNG字节直接插入文档，无需PIL解码再编码
+                doc.add_picture(BytesIO(data), width=Inches(width))
 
                 # 添加空行
                 doc.add_paragraph()
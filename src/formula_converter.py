@@ -5,11 +5,164 @@
 
 import re
 import logging
-from typing import List, Tuple, Dict, Optional
+import unicodedata
+from functools import lru_cache
+from typing import Iterable, Iterator, List, Tuple, Dict, Optional
 from latex2mathml.converter import convert as latex_to_mathml
 
+try:
+    import re2 as _aligned_re  # DFA引擎，缺少 \end{aligned} 时也保证线性时间
+except ImportError:  # pragma: no cover - optional dependency
+    _aligned_re = re
+
 logger = logging.getLogger(__name__)
 
+# aligned环境预处理用到的正则（模块加载时编译一次）
+# 使用内联 (?s) 而非 re.DOTALL，两种引擎都能识别
+_ALIGNED_ENV_PATTERN = _aligned_re.compile(r'(?s)\\begin\{aligned\}(.*?)\\end\{aligned\}')
+# LaTeX 换行符 \\（纯字面量，用 str.split 即可，无需正则）
+_LATEX_LINE_BREAK = '\\\\'
+
+
+@lru_cache(maxsize=2048)
+def _cached_latex_to_mathml(latex: str) -> str:
+    """latex2mathml转换结果缓存（多页中重复出现的公式只转换一次）"""
+    return latex_to_mathml(latex)
+
+
+# fix_common_latex_patterns 用到的正则（模块加载时编译一次）
+# 控制字符：除换行\n、回车\r、制表符\t外的ASCII控制字符
+_CONTROL_CHARS_RE = re.compile(r'[\x00-\x08\x0B\x0C\x0E-\x1F\x7F]')
+_OCR_BAR_RE = re.compile(r'(?<!\\b)ar\{')  # 已是 \bar{ 的不再处理
+_SUBSCRIPT_SPACE_NUMBER_RE = re.compile(r'([A-Za-z]_[A-Za-z0-9]+)\s+(\d+)')
+_SUBSCRIPT_NO_SPACE_NUMBER_RE = re.compile(r'([A-Za-z]_\d)(\d+)')
+_BAR_MISSING_SUBSCRIPT_RE = re.compile(r'\\bar\{([A-Za-z])\}(\d+)')
+_COMBINING_OVERLINE_RE = re.compile(r'([A-Za-z])\u0304')  # \u0304 是组合上划线
+_INLINE_MATH_RE = re.compile(r'\$([^$]+)\$')
+_TEXT_FRACTION_RE = re.compile(r'\(([^)]+)\)/\(([^)]+)\)|(\w+)/(\w+)')
+_BARE_SUPERSCRIPT_RE = re.compile(r'\^([a-zA-Z0-9]{2,})')
+_BARE_SUBSCRIPT_RE = re.compile(r'_([a-zA-Z0-9]{2,})')
+# format_for_word：```code``` 区块
+_CODE_BLOCK_RE = re.compile(r'```[\s\S]*?```')
+# 常见错误表达：(日志说明, 正则, 替换函数)
+# 各模式互不重叠，替换结果也不会产生新的匹配，因此合并成一条具名分组的交替正则一趟扫描完成；
+# 替换用函数直接给出字面结果（re 的替换模板会把 \b 解释成退格符）
+_ERROR_FIXES = (
+    (r'Y-→\bar{Y}', r'Y-', lambda m: r'\bar{Y}'),  # Y- → \bar{Y}
+    (r'x-→\bar{x}', r'x-', lambda m: r'\bar{x}'),  # x- → \bar{x}
+    (r'(\d+)\*(\d+)→\1 \\times \2', r'(?P<lhs>\d+)\*(?P<rhs>\d+)',
+     lambda m: f"{m['lhs']} \\times {m['rhs']}"),  # 数字乘法用 \times
+)
+_ERROR_PATTERN_RE = re.compile(
+    '|'.join(f'(?P<e{i}>{pattern})' for i, (_, pattern, _) in enumerate(_ERROR_FIXES))
+)
+_ERROR_GROUP_INDEX = {f'e{i}': i for i in range(len(_ERROR_FIXES))}
+# normalize_math_spans：显示公式 $$...$$ 与行内公式 $...$
+_MATH_SPAN_RE = re.compile(r'\$\$[\s\S]+?\$\$|\$[^$]+\$')
+# 带上划线（长音符）的预组合字母 → \bar{}，只用于公式片段
+_MACRON_TRANSLATION = str.maketrans({
+    'Ā': r'\bar{A}', 'ā': r'\bar{a}',
+    'Ē': r'\bar{E}', 'ē': r'\bar{e}',
+    'Ḡ': r'\bar{G}', 'ḡ': r'\bar{g}',
+    'Ī': r'\bar{I}', 'ī': r'\bar{i}',
+    'Ō': r'\bar{O}', 'ō': r'\bar{o}',
+    'Ū': r'\bar{U}', 'ū': r'\bar{u}',
+    'Ȳ': r'\bar{Y}', 'ȳ': r'\bar{y}',
+})
+
+
+def _normalize_math_span(match) -> str:
+    span = match.group()
+    if span.isascii():
+        return span
+    return unicodedata.normalize('NFC', span).translate(_MACRON_TRANSLATION)
+
+
+def _replace_text_fraction(frac_match) -> str:
+    if frac_match.group(1):  # (a)/(b) 格式
+        return f'\\frac{{{frac_match.group(1)}}}{{{frac_match.group(2)}}}'
+    else:  # a/b 格式
+        return f'\\frac{{{frac_match.group(3)}}}{{{frac_match.group(4)}}}'
+
+
+def _fix_common_latex_patterns(content: str) -> Tuple[str, Tuple[str, ...]]:
+    """
+    fix_common_latex_patterns 的纯函数部分（只依赖输入字符串）
+
+    各修复按顺序执行（后面的修复依赖前面的结果，不能合并成一条交替正则），
+    每一步用 subn 一趟完成查找和替换，不再先 search 再 sub。
+
+    Returns:
+        (修复后的内容, 应用的修复说明)
+    """
+    fixes_applied = []
+
+    # -1. 清理控制字符（LLM有时会输出backspace等控制字符）
+    # 注意：必须在所有正则匹配之前清理，因为控制字符会干扰正则匹配
+    content, count = _CONTROL_CHARS_RE.subn('', content)
+    if count:
+        fixes_applied.append("清理控制字符")
+
+    # 0. 修复OCR常见错误
+    # 修复 ar{ → \bar{ (OCR经常把 \bar 识别成 ar，或者带控制字符如 \x08ar{)
+    content, count = _OCR_BAR_RE.subn(r'\\bar{', content)
+    if count:
+        fixes_applied.append("ar{→\\bar{")
+
+    # 修复 下标+空格+数字 → 下标^数字 (例如: y_0 2 → y_0^2, x_0 2 → x_0^2)
+    content, count = _SUBSCRIPT_SPACE_NUMBER_RE.subn(r'\1^\2', content)
+    if count:
+        fixes_applied.append("下标+空格+数字→下标^数字")
+
+    # 修复 下标+数字（无空格）→ 下标^数字 (例如: y_02 → y_0^2, x_01 → x_0^1, 2y_02 → 2y_0^2)
+    # 注意：允许修复大括号内的错误（如\frac{x_02}{...}）
+    content, count = _SUBSCRIPT_NO_SPACE_NUMBER_RE.subn(r'\1^\2', content)
+    if count:
+        fixes_applied.append("下标+数字（无空格）→下标^数字")
+
+    # 修复 \bar{字母} 后面直接跟数字，缺少下标符号 (例如: ar{x}1 → \bar{x}_1)
+    content, count = _BAR_MISSING_SUBSCRIPT_RE.subn(r'\\bar{\1}_\2', content)
+    if count:
+        fixes_applied.append("\\bar{x}数字→\\bar{x}_数字")
+
+    # 1. 修复组合字符的上划线 (字母 + U+0304，如 x̄) → \bar{x}
+    content, count = _COMBINING_OVERLINE_RE.subn(r'\\bar{\1}', content)
+    if count:
+        fixes_applied.append("组合上划线→\\bar{}")
+
+    # 2. 修复文本形式的分数 (a)/(b) 或 a/b → \frac{a}{b}
+    # 3. 修复缺失花括号的上下标 (例如: x^2y → x^{2}y, Y_i+1 → Y_{i+1})
+    # 两步都只作用于行内公式，且不会增删 $，因此在同一趟 $...$ 扫描中依次完成
+    def fix_inline_math(match):
+        math_content = match.group(1)
+
+        fixed = _TEXT_FRACTION_RE.sub(_replace_text_fraction, math_content)
+        if fixed != math_content:
+            fixes_applied.append("文本分数→\\frac{}{}")
+
+        # 修复上标: x^abc → x^{abc}
+        fixed = _BARE_SUPERSCRIPT_RE.sub(r'^{\1}', fixed)
+        # 修复下标: x_abc → x_{abc}
+        fixed = _BARE_SUBSCRIPT_RE.sub(r'_{\1}', fixed)
+        return f'${fixed}$'
+
+    content = _INLINE_MATH_RE.sub(fix_inline_math, content)
+
+    # 4. 修复常见的错误表达（一趟扫描，按分组名分派替换）
+    error_counts = [0] * len(_ERROR_FIXES)
+
+    def fix_error_pattern(match):
+        index = _ERROR_GROUP_INDEX[match.lastgroup]
+        error_counts[index] += 1
+        return _ERROR_FIXES[index][2](match)
+
+    content = _ERROR_PATTERN_RE.sub(fix_error_pattern, content)
+    fixes_applied.extend(
+        description for (description, _, _), count in zip(_ERROR_FIXES, error_counts) if count
+    )
+
+    return content, tuple(fixes_applied)
+
 
 class FormulaConverter:
     """公式转换器类"""
@@ -93,6 +246,9 @@ class FormulaConverter:
         'Ω': r'\Omega',
     }
 
+    # str.translate 用的码位映射：一趟扫描完成全部替换（替换结果都是ASCII，不会产生新的待替换字符）
+    _UNICODE_TRANSLATION = str.maketrans(UNICODE_TO_LATEX)
+
     def __init__(self, config: dict):
         """
         初始化公式转换器
@@ -116,20 +272,39 @@ class FormulaConverter:
         Returns:
             转换后的内容
         """
-        original_content = content
-        replacements_made = []
+        # 纯ASCII内容不可能包含待替换符号
+        if content.isascii():
+            return content
+
+        # 只在需要日志时统计各符号出现次数（按映射表顺序输出）
+        if logger.isEnabledFor(logging.INFO):
+            present = set(content)
+            replacements_made = [
+                f"{unicode_char}→{latex_cmd} ({content.count(unicode_char)}次)"
+                for unicode_char, latex_cmd in self.UNICODE_TO_LATEX.items()
+                if unicode_char in present
+            ]
+            if replacements_made:
+                logger.info(f"Unicode→LaTeX转换: {', '.join(replacements_made)}")
+
+        return content.translate(self._UNICODE_TRANSLATION)
+
+    def normalize_math_spans(self, content: str) -> str:
+        """
+        规范化公式片段($...$、$$...$$)中的Unicode字符
 
-        # 替换所有Unicode符号
-        for unicode_char, latex_cmd in self.UNICODE_TO_LATEX.items():
-            if unicode_char in content:
-                count = content.count(unicode_char)
-                content = content.replace(unicode_char, latex_cmd)
-                replacements_made.append(f"{unicode_char}→{latex_cmd} ({count}次)")
+        片段内先做NFC（组合序列如 Y+U+0304 合成为 Ȳ；不用NFKC，以免改变²、½等字符），
+        再把带上划线的字母转为 \\bar{}。正文保持原样，拼音（如 māma）等不受影响。
 
-        if replacements_made:
-            logger.info(f"Unicode→LaTeX转换: {', '.join(replacements_made)}")
+        Args:
+            content: LLM输出内容
 
-        return content
+        Returns:
+            处理后的内容
+        """
+        if content.isascii():
+            return content
+        return _MATH_SPAN_RE.sub(_normalize_math_span, content)
 
     def fix_common_latex_patterns(self, content: str) -> str:
         """
@@ -141,100 +316,7 @@ class FormulaConverter:
         Returns:
             修复后的内容
         """
-        import re
-
-        fixes_applied = []
-
-        # -1. 清理控制字符（LLM有时会输出backspace等控制字符）
-        # 移除所有ASCII控制字符（除了换行\n、回车\r、制表符\t）
-        # 注意：必须在所有正则匹配之前清理，因为控制字符会干扰正则匹配
-        control_chars = r'[\x00-\x08\x0B\x0C\x0E-\x1F\x7F]'
-        if re.search(control_chars, content):
-            content = re.sub(control_chars, '', content)
-            fixes_applied.append("清理控制字符")
-
-        # 0. 修复OCR常见错误
-        # 修复 ar{ → \bar{ (OCR经常把 \bar 识别成 ar，或者带控制字符如 \x08ar{)
-        # 先匹配可能带控制字符的情况
-        if re.search(r'(?<!\\)ar\{', content):
-            content = re.sub(r'(?<!\\)ar\{', r'\\bar{', content)
-            fixes_applied.append("ar{→\\bar{")
-
-        # 修复 下标+空格+数字 → 下标^数字 (例如: y_0 2 → y_0^2, x_0 2 → x_0^2)
-        # 匹配模式: 字母_数字或字母 后跟 空格 数字
-        subscript_space_number = r'([A-Za-z]_[A-Za-z0-9]+)\s+(\d+)'
-        if re.search(subscript_space_number, content):
-            content = re.sub(subscript_space_number, r'\1^\2', content)
-            fixes_applied.append("下标+空格+数字→下标^数字")
-
-        # 修复 下标+数字（无空格）→ 下标^数字 (例如: y_02 → y_0^2, x_01 → x_0^1, 2y_02 → 2y_0^2)
-        # 匹配模式: 字母_单个数字 后面直接跟数字（无空格）
-        # 注意：移除了(?<!{)限制，允许修复大括号内的错误（如\frac{x_02}{...}）
-        subscript_no_space_number = r'([A-Za-z]_\d)(\d+)'
-        if re.search(subscript_no_space_number, content):
-            content = re.sub(subscript_no_space_number, r'\1^\2', content)
-            fixes_applied.append("下标+数字（无空格）→下标^数字")
-
-        # 修复 ar{ 后面跟字母和数字，但缺少下标符号 (例如: ar{x}1 → \bar{x}_1)
-        # 这个模式匹配 \bar{字母}数字，添加缺失的下标
-        bar_missing_subscript = r'\\bar\{([A-Za-z])\}(\d+)'
-        if re.search(bar_missing_subscript, content):
-            content = re.sub(bar_missing_subscript, r'\\bar{\1}_\2', content)
-            fixes_applied.append("\\bar{x}数字→\\bar{x}_数字")
-
-        # 1. 修复组合字符的上划线 (Ȳ, ā 等) → \bar{Y}, \bar{a}
-        # 匹配带组合上划线的拉丁字母
-        combining_overline_pattern = r'([A-Za-z])\u0304'  # \u0304 是组合上划线
-        if re.search(combining_overline_pattern, content):
-            def replace_overline(match):
-                return f'\\bar{{{match.group(1)}}}'
-            content = re.sub(combining_overline_pattern, replace_overline, content)
-            fixes_applied.append("组合上划线→\\bar{}")
-
-        # 2. 修复文本形式的分数 (a)/(b) 或 a/b → \frac{a}{b}
-        # 注意：只在 $ 公式环境内修复
-        def fix_fractions_in_math(match):
-            math_content = match.group(1)
-            # 匹配 (expression)/(expression) 或 word/word
-            fraction_pattern = r'\(([^)]+)\)/\(([^)]+)\)|(\w+)/(\w+)'
-
-            def replace_fraction(frac_match):
-                if frac_match.group(1):  # (a)/(b) 格式
-                    return f'\\frac{{{frac_match.group(1)}}}{{{frac_match.group(2)}}}'
-                else:  # a/b 格式
-                    return f'\\frac{{{frac_match.group(3)}}}{{{frac_match.group(4)}}}'
-
-            fixed = re.sub(fraction_pattern, replace_fraction, math_content)
-            if fixed != math_content:
-                fixes_applied.append("文本分数→\\frac{}{}")
-            return f'${fixed}$'
-
-        # 只在行内公式中修复
-        content = re.sub(r'\$([^$]+)\$', fix_fractions_in_math, content)
-
-        # 3. 修复缺失花括号的上下标 (例如: x^2y → x^{2}y, Y_i+1 → Y_{i+1})
-        # 这个比较复杂，暂时只处理简单情况
-        def fix_subscripts_superscripts(match):
-            math_content = match.group(1)
-            # 修复上标: x^abc → x^{abc}
-            math_content = re.sub(r'\^([a-zA-Z0-9]{2,})', r'^{\1}', math_content)
-            # 修复下标: x_abc → x_{abc}
-            math_content = re.sub(r'_([a-zA-Z0-9]{2,})', r'_{\1}', math_content)
-            return f'${math_content}$'
-
-        content = re.sub(r'\$([^$]+)\$', fix_subscripts_superscripts, content)
-
-        # 4. 修复常见的错误表达
-        error_patterns = {
-            r'Y-': r'\bar{Y}',  # Y- → \bar{Y}
-            r'x-': r'\bar{x}',  # x- → \bar{x}
-            r'(\d+)\*(\d+)': r'\1 \\times \2',  # 数字乘法用 \times
-        }
-
-        for pattern, replacement in error_patterns.items():
-            if re.search(pattern, content):
-                content = re.sub(pattern, replacement, content)
-                fixes_applied.append(f"{pattern}→{replacement}")
+        content, fixes_applied = _fix_common_latex_patterns(content)
 
         if fixes_applied:
             logger.info(f"LaTeX格式修复: {', '.join(fixes_applied)}")
@@ -255,6 +337,9 @@ class FormulaConverter:
         logger.info("开始后处理LLM输出")
         logger.info("=" * 80)
 
+        # 0. 公式片段内的上划线字母 → \bar{}（正文不动，保留拼音等）
+        content = self.normalize_math_spans(content)
+
         # 1. Unicode符号转LaTeX
         content = self.fix_unicode_to_latex(content)
 
@@ -277,13 +362,30 @@ class FormulaConverter:
         Returns:
             包含文本和公式的结构化列表
         """
+        return list(self._iter_elements(content))
+
+    def parse_and_format_for_word(self, content: str) -> Iterator[Dict]:
+        """
+        解析内容并直接产出适合插入Word的元素
+        等价于 format_for_word(parse_content(content))，但解析结果逐个交给格式化，不构造中间列表
+
+        Args:
+            content: LLM返回的内容
+
+        Returns:
+            格式化后元素的迭代器
+        """
+        return self._iter_formatted(self._iter_elements(content))
+
+    def _iter_elements(self, content: str) -> Iterator[Dict]:
+        """逐个产出 parse_content 的元素"""
         # 先进行后处理修复
         content = self.post_process_llm_output(content)
 
         # 预处理：修复LLM可能返回的格式问题
         content = self._preprocess_llm_output(content)
 
-        elements = []
+        element_count = 0
         current_pos = 0
 
         # 只查找显示公式 $$...$$, \[...\], \begin{equation}...\end{equation}
@@ -305,18 +407,20 @@ class FormulaConverter:
             if current_pos < formula['start']:
                 text = content[current_pos:formula['start']].strip()
                 if text:
-                    elements.append({
+                    element_count += 1
+                    yield {
                         'type': 'text',
                         'content': text
-                    })
+                    }
 
             # 添加显示公式
-            elements.append({
+            element_count += 1
+            yield {
                 'type': 'formula',
                 'formula_type': formula['type'],
                 'latex': formula['latex'],
                 'mathml': self._convert_to_mathml(formula['latex'])
-            })
+            }
 
             current_pos = formula['end']
 
@@ -324,10 +428,11 @@ class FormulaConverter:
         if current_pos < len(content):
             text = content[current_pos:].strip()
             if text:
-                elements.append({
+                element_count += 1
+                yield {
                     'type': 'text',
                     'content': text
-                })
+                }
 
         # 统计行内公式数量
         inline_count = len(re.findall(self.INLINE_FORMULA_PATTERN, content))
@@ -335,8 +440,7 @@ class FormulaConverter:
         for formula in display_formulas:
             inline_count -= content[formula['start']:formula['end']].count('$') // 2
 
-        logger.info(f"解析完成: {len(elements)} 个元素 ({len(display_formulas)} 个显示公式, {inline_count} 个行内公式保留在文本中)")
-        return elements
+        logger.info(f"解析完成: {element_count} 个元素 ({len(display_formulas)} 个显示公式, {inline_count} 个行内公式保留在文本中)")
 
     def _preprocess_llm_output(self, content: str) -> str:
         """
@@ -496,7 +600,7 @@ class FormulaConverter:
             latex_preprocessed = self._preprocess_latex(latex)
             
             # 转换为MathML
-            mathml = latex_to_mathml(latex_preprocessed)
+            mathml = _cached_latex_to_mathml(latex_preprocessed)
             
             logger.debug(f"LaTeX转MathML成功")
             logger.debug(f"  原始LaTeX: {latex[:100]}{'...' if len(latex) > 100 else ''}")
@@ -554,16 +658,11 @@ class FormulaConverter:
         Returns:
             处理后的LaTeX字符串
         """
-        import re
-
-        # 匹配aligned环境 - 注意要用非贪婪匹配
-        aligned_pattern = r'\\begin\{aligned\}(.*?)\\end\{aligned\}'
-
         def process_aligned_content(match):
             content = match.group(1)
 
             # 将 \\\\ 分割行 (在Python字符串中, \\\\ 表示两个反斜杠)
-            lines = re.split(r'\\\\', content)
+            lines = content.split(_LATEX_LINE_BREAK)
             lines = [line.strip() for line in lines if line.strip()]
 
             # 如果只有一行,简单处理
@@ -591,8 +690,8 @@ class FormulaConverter:
             else:
                 return content.replace('&', '').strip()
 
-        # 替换所有aligned环境
-        result = re.sub(aligned_pattern, process_aligned_content, latex, flags=re.DOTALL)
+        # 替换所有aligned环境（非贪婪匹配）
+        result = _ALIGNED_ENV_PATTERN.sub(process_aligned_content, latex)
 
         return result
     
@@ -651,17 +750,19 @@ class FormulaConverter:
         Returns:
             格式化后的元素列表
         """
-        formatted = []
-        
+        return list(self._iter_formatted(elements))
+
+    @staticmethod
+    def _iter_formatted(elements: Iterable[Dict]) -> Iterator[Dict]:
+        """逐个产出 format_for_word 的元素（输入可以是生成器）"""
         for element in elements:
             if element['type'] == 'text':
                 content = element['content']
                 paragraphs: List[str] = []
 
                 # 保留 ```code``` 区块，不被换行分割
-                pattern = re.compile(r'```[\s\S]*?```')
                 last_pos = 0
-                for block in pattern.finditer(content):
+                for block in _CODE_BLOCK_RE.finditer(content):
                     pre = content[last_pos:block.start()]
                     if pre:
                         paragraphs.extend([p for p in pre.split('\n\n') if p.strip()])
@@ -673,20 +774,18 @@ class FormulaConverter:
                     paragraphs.extend([p for p in tail.split('\n\n') if p.strip()])
 
                 for para in paragraphs:
-                    formatted.append({
+                    yield {
                         'type': 'paragraph',
                         'content': para
-                    })
+                    }
             
             elif element['type'] == 'formula':
-                formatted.append({
+                yield {
                     'type': 'formula',
                     'formula_type': element['formula_type'],
                     'latex': element['latex'],
                     'mathml': element['mathml']
-                })
-        
-        return formatted
+                }
     
     def validate_latex(self, latex: str) -> Tuple[bool, Optional[str]]:
         """
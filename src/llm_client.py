@@ -11,7 +11,7 @@ import logging
 import inspect
 from io import BytesIO
 from concurrent.futures import ThreadPoolExecutor, as_completed
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Iterator
 from PIL import Image
 
 import httpx
@@ -231,24 +231,30 @@ class LLMClient:
 
     def analyze_images(self, images: List[Image.Image], original_image: Optional[Image.Image] = None) -> List[Dict[str, Any]]:
         """并行或串行分析多张图像"""
+        return list(self.analyze_images_stream(images, original_image))
+
+    def analyze_images_stream(self, images: List[Image.Image],
+                              original_image: Optional[Image.Image] = None) -> Iterator[Dict[str, Any]]:
+        """并行或串行分析多张图像，按分片顺序逐个产出结果"""
         if not images:
-            return []
+            return
 
         # 获取原图尺寸用于坐标转换
         original_size = original_image.size if original_image else None
 
         if len(images) == 1 or not self.concurrent_enabled or self.max_parallel_requests <= 1:
-            sequential_results: List[Dict[str, Any]] = []
             for idx, img in enumerate(images):
                 logger.info("串行处理图像分片 %s/%s", idx + 1, len(images))
                 result = self.analyze_image(img)
                 result = self._post_process_geometry(result, img, original_size)
                 result['segment_index'] = idx
-                sequential_results.append(result)
-            return sequential_results
+                yield result
+            return
 
         max_workers = max(1, min(self.max_parallel_requests, len(images)))
-        results: List[Optional[Dict[str, Any]]] = [None] * len(images)
+        # 乱序完成的分片暂存于此，待前序分片产出后再按顺序产出
+        pending: Dict[int, Dict[str, Any]] = {}
+        next_index = 0
 
         def _worker(index: int, img: Image.Image) -> Dict[str, Any]:
             logger.info("并行处理图像分片 %s/%s", index + 1, len(images))
@@ -266,7 +272,7 @@ class LLMClient:
             for future in as_completed(future_map):
                 idx = future_map[future]
                 try:
-                    results[idx] = future.result()
+                    pending[idx] = future.result()
                 except Exception as exc:  # noqa: BLE001
                     logger.error("分片 %s 处理失败: %s", idx + 1, exc)
                     # 取消其他任务
@@ -275,7 +281,9 @@ class LLMClient:
                             pending_future.cancel()
                     raise
 
-        return [res for res in results if res is not None]
+                while next_index in pending:
+                    yield pending.pop(next_index)
+                    next_index += 1
 
     GEOMETRY_PLACEHOLDER_PATTERN = re.compile(
         r'```(?:latex|tex)?\s*\\begin\{figure\}.*?\\includegraphics[^{}]*\{placeholder\.png\}.*?```',
@@ -4,10 +4,11 @@
 """
 
 import os
+import re
 import sys
 import logging
 from pathlib import Path
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Iterable
 from datetime import datetime
 
 import yaml
@@ -20,6 +21,10 @@ from .formula_converter import FormulaConverter
 from .document_generator import DocumentGenerator
 
 
+# 重叠检测使用的空白符匹配
+_WHITESPACE_PATTERN = re.compile(r'\s+')
+
+
 class AdvancedOCR:
     """高级OCR主类"""
     
@@ -150,23 +155,27 @@ class AdvancedOCR:
                 len(processed_images)
             )
 
-            analysis_segments = self.llm_client.analyze_images(processed_images, original_image)
+            analysis_segments = self.llm_client.analyze_images_stream(processed_images, original_image)
             analysis_result = self._merge_analysis_segments(analysis_segments)
 
             content = analysis_result['content']
             self.logger.info(f"LLM分析完成,内容长度: {len(content)} 字符")
-            self.logger.debug(f"LLM提供商: {analysis_result.get('provider', 'unknown')}")
-            self.logger.debug(f"LLM模型: {analysis_result.get('model', 'unknown')}")
-            # 记录原始输出(前1000字符)
-            if len(content) <= 1000:
-                self.logger.debug(f"LLM原始输出:\n{content}")
-            else:
-                self.logger.debug(f"LLM原始输出(前1000字符):\n{content[:1000]}\n... (共{len(content)}字符)")
+            # 记录提供商/模型及原始输出(前1000字符)，DEBUG未开启时不构造日志文本
+            if self.logger.isEnabledFor(logging.DEBUG):
+                self.logger.debug(
+                    "LLM提供商: %s, LLM模型: %s",
+                    analysis_result.get('provider', 'unknown'),
+                    analysis_result.get('model', 'unknown')
+                )
+                if len(content) <= 1000:
+                    self.logger.debug("LLM原始输出:\n%s", content)
+                else:
+                    self.logger.debug("LLM原始输出(前1000字符):\n%s\n... (共%s字符)",
+                                      content[:1000], len(content))
             
             # 4. 解析和转换公式
             self.logger.info("步骤 4/5: 解析和转换公式")
-            elements = self.formula_converter.parse_content(content)
-            formatted_elements = self.formula_converter.format_for_word(elements)
+            formatted_elements = list(self.formula_converter.parse_and_format_for_word(content))
             
             # 获取公式统计
             stats = self.formula_converter.get_formula_statistics(content)
@@ -197,14 +206,11 @@ class AdvancedOCR:
             }
 
     @staticmethod
-    def _merge_analysis_segments(segments: List[Dict[str, Any]]) -> Dict[str, Any]:
-        """合并多段LLM分析结果"""
+    def _merge_analysis_segments(segments: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+        """合并多段LLM分析结果（逐段消费，支持生成器输入）"""
         # 在静态方法开始时获取logger实例
         _logger = logging.getLogger(__name__)
 
-        if not segments:
-            raise ValueError("LLM未返回任何内容")
-
         def _ordered_unique(items: List[Optional[str]]) -> List[str]:
             seen = set()
             ordered: List[str] = []
@@ -221,21 +227,28 @@ class AdvancedOCR:
         models: List[str] = []
         total_usage: Dict[str, int] = {}
         normalized_segments: List[Dict[str, Any]] = []
+        merged_metadata: Dict[str, Any] = {}
+        segment_count = 0
 
-        combined_content = ""
+        combined_parts: List[str] = []
+        # 重叠检测只比较去空白后的文本：每段只归一化一次，各段结果按顺序保存
+        no_space_parts: List[str] = []
 
         for idx, segment in enumerate(segments):
+            segment_count += 1
             segment_content = (segment.get('content') or '').strip()
 
             # 应用重叠检测和移除
-            trimmed_content = AdvancedOCR._trim_overlap_text(combined_content, segment_content)
+            trimmed_content = AdvancedOCR._trim_overlap_text(
+                ''.join(no_space_parts), segment_content, existing_normalized=True
+            )
 
             # 记录处理结果
             if len(trimmed_content) < len(segment_content):
                 removed = len(segment_content) - len(trimmed_content)
-                _logger.info(f"分片 {idx+1}/{len(segments)}: 移除 {removed} 字符重叠")
+                _logger.info(f"分片 {idx+1}: 移除 {removed} 字符重叠")
             else:
-                _logger.debug(f"分片 {idx+1}/{len(segments)}: 无重叠")
+                _logger.debug(f"分片 {idx+1}: 无重叠")
 
             segment_copy = dict(segment)
             segment_copy['content_trimmed'] = trimmed_content
@@ -255,13 +268,31 @@ class AdvancedOCR:
                     continue
                 total_usage[key] = total_usage.get(key, 0) + int(value)
 
+            # 合并metadata，特别是geometry_image
+            seg_metadata = segment.get('metadata', {})
+            for key, value in seg_metadata.items():
+                if key == 'geometry_image' and value:
+                    # geometry_image存在则使用（通常只有一个分片有）
+                    merged_metadata['geometry_image'] = value
+                elif key == 'geometry_elements' and value:
+                    merged_metadata['geometry_elements'] = value
+                elif key == 'has_geometry' and value:
+                    merged_metadata['has_geometry'] = True
+                elif key not in merged_metadata:
+                    # 其他metadata字段，如果还没设置则使用第一个
+                    merged_metadata[key] = value
+
             if not trimmed_content:
                 continue
 
-            if combined_content:
-                combined_content = f"{combined_content}\n\n{trimmed_content}"
-            else:
-                combined_content = trimmed_content
+            combined_parts.append(trimmed_content)
+            no_space_parts.append(AdvancedOCR._remove_all_spaces(trimmed_content))
+
+        combined_content = "\n\n".join(combined_parts)
+
+        if not segment_count:
+            raise ValueError("LLM未返回任何内容")
+
         provider_list = _ordered_unique(providers) or ['unknown']
         model_list = _ordered_unique(models) or ['unknown']
 
@@ -273,14 +304,14 @@ class AdvancedOCR:
         if len(model_list) == 1:
             model_label = model_list[0]
         else:
-            model_label = f"segments={len(segments)}"
+            model_label = f"segments={segment_count}"
 
         merged: Dict[str, Any] = {
             'provider': provider_label,
             'model': model_label,
             'content': combined_content,
             'segments': normalized_segments,
-            'segment_count': len(segments),
+            'segment_count': segment_count,
             'providers': provider_list,
             'models': model_list,
         }
@@ -288,32 +319,42 @@ class AdvancedOCR:
         if total_usage:
             merged['usage'] = total_usage
 
-        # 合并metadata，特别是geometry_image
-        merged_metadata = {}
-        for segment in segments:
-            seg_metadata = segment.get('metadata', {})
-            # 合并metadata字段
-            for key, value in seg_metadata.items():
-                if key == 'geometry_image' and value:
-                    # geometry_image存在则使用（通常只有一个分片有）
-                    merged_metadata['geometry_image'] = value
-                elif key == 'geometry_elements' and value:
-                    merged_metadata['geometry_elements'] = value
-                elif key == 'has_geometry' and value:
-                    merged_metadata['has_geometry'] = True
-                elif key not in merged_metadata:
-                    # 其他metadata字段，如果还没设置则使用第一个
-                    merged_metadata[key] = value
-
         if merged_metadata:
             merged['metadata'] = merged_metadata
 
         return merged
 
+    @staticmethod
+    def _find_longest_overlap(tail: str, candidate: str, min_overlap: int, max_len: int) -> int:
+        """返回 tail 后缀与 candidate 前缀的最长重叠长度（不足 min_overlap 时返回0）"""
+        tail = tail[-max_len:]
+        tail_len = len(tail)
+        # 任何合格重叠都以 candidate 的前 min_overlap 个字符开头，
+        # 用 str.find 定位锚点、str.startswith 校验剩余部分，比较都在C层完成
+        anchor = candidate[:min_overlap]
+
+        # 从左向右扫描：越靠前的起点对应越长的重叠，第一个通过校验的即为最长
+        start = tail.find(anchor)
+        while start != -1:
+            if candidate.startswith(tail[start:]):
+                return tail_len - start
+            start = tail.find(anchor, start + 1)
+
+        return 0
+
+    @staticmethod
+    def _remove_all_spaces(text: str) -> str:
+        """完全移除所有空白符，只保留内容"""
+        return _WHITESPACE_PATTERN.sub('', text)
+
     @staticmethod
     def _trim_overlap_text(existing: str, new_content: str, max_overlap: int = 2000,
-                           min_overlap: int = 30) -> str:
-        """去除与已合并文本重复的前缀,缓解切片重叠导致的重复"""
+                           min_overlap: int = 30, existing_normalized: bool = False) -> str:
+        """
+        去除与已合并文本重复的前缀,缓解切片重叠导致的重复
+
+        existing_normalized 为 True 时 existing 已是去空白后的文本，不再重复归一化
+        """
         # 获取logger实例(在静态方法中)
         _logger = logging.getLogger(__name__)
 
@@ -330,15 +371,11 @@ class AdvancedOCR:
             _logger.debug(f"无已有内容，保留完整新内容 ({len(candidate)} 字符)")
             return candidate
 
-        import re
-
         # 完全移除空格的归一化（最激进）
-        def remove_all_spaces(text: str) -> str:
-            """完全移除所有空白符，只保留内容"""
-            return re.sub(r'\s+', '', text)
+        remove_all_spaces = AdvancedOCR._remove_all_spaces
 
         # 完全无空格版本
-        existing_no_space = remove_all_spaces(existing)
+        existing_no_space = existing if existing_normalized else remove_all_spaces(existing)
         candidate_no_space = remove_all_spaces(candidate)
 
         _logger.debug(
@@ -358,9 +395,19 @@ class AdvancedOCR:
             )
             return ""
 
+        # 比较窗口不超过两段文本的实际长度，避免无谓的切片和循环
+        max_len = min(len(existing_no_space), len(candidate_no_space), max_overlap)
+        if max_len < min_overlap:
+            _logger.debug("✗ 可比较长度 %s 小于最小重叠 %s，保留完整内容", max_len, min_overlap)
+            return candidate
+
         # 获取尾部用于比较（无空格版本）
-        existing_tail_no_space = existing_no_space[-max_overlap:]
-        max_len = min(len(existing_tail_no_space), len(candidate_no_space))
+        existing_tail_no_space = existing_no_space[-max_len:]
+
+        # 新内容首字符不在尾部出现时不可能存在重叠
+        if candidate_no_space[0] not in existing_tail_no_space:
+            _logger.debug("✗ 新内容首字符未出现在已有尾部，保留完整内容")
+            return candidate
 
         _logger.debug(
             "搜索重叠: 在已有内容尾部 %s 字符中，搜索 %s-%s 字符的匹配",
@@ -369,27 +416,17 @@ class AdvancedOCR:
             max_len
         )
 
-        # 尝试找到最长的重叠部分（无空格版本）
-        best_overlap_len = 0
-        best_suffix = None
-        best_prefix = None
-
-        for overlap in range(max_len, min_overlap - 1, -1):
-            suffix = existing_tail_no_space[-overlap:]
-            prefix = candidate_no_space[:overlap]
-
-            # 精确匹配（无空格）
-            if suffix == prefix:
-                best_overlap_len = overlap
-                best_suffix = suffix
-                best_prefix = prefix
-                _logger.info(
-                    "✓ 发现重叠(无空格): %s 字符\n"
-                    "  重叠内容前50字符: %s...",
-                    overlap,
-                    prefix[:50]
-                )
-                break
+        # 尝试找到最长的重叠部分（无空格版本，锚点查找+前缀校验）
+        best_overlap_len = AdvancedOCR._find_longest_overlap(
+            existing_tail_no_space, candidate_no_space, min_overlap, max_len
+        )
+        if best_overlap_len > 0:
+            _logger.info(
+                "✓ 发现重叠(无空格): %s 字符\n"
+                "  重叠内容前50字符: %s...",
+                best_overlap_len,
+                candidate_no_space[:50]
+            )
 
         if best_overlap_len > 0:
             # 找到重叠，需要在原始文本中找到切分位置
@@ -521,7 +558,7 @@ class AdvancedOCR:
                 all_original_images.append(original_image)
 
                 # 3. 调用LLM分析
-                analysis_segments = self.llm_client.analyze_images(processed_images, original_image)
+                analysis_segments = self.llm_client.analyze_images_stream(processed_images, original_image)
                 analysis_result = self._merge_analysis_segments(analysis_segments)
 
                 content = analysis_result['content']
@@ -537,9 +574,7 @@ class AdvancedOCR:
                 combined_analysis['content'] += f'# 图像 {idx}\n\n{content}'
 
                 # 4. 解析和转换公式
-                elements = self.formula_converter.parse_content(content)
-                formatted_elements = self.formula_converter.format_for_word(elements)
-                all_elements.extend(formatted_elements)
+                all_elements.extend(self.formula_converter.parse_and_format_for_word(content))
 
                 # 统计公式
                 stats = self.formula_converter.get_formula_statistics(content)
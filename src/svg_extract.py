@@ -0,0 +1,66 @@
+"""
+SVG JSON块提取模块
+只依赖标准库，便于在不加载 docx/PIL 的情况下单独使用和测试
+"""
+
+import re
+import json
+from typing import List, Tuple
+
+# SVG JSON候选位置：【图形】标记后紧跟 { ，或包含 "img_b64" 键
+SVG_JSON_PATTERN = re.compile(r'【图形】\s*(?=\{)|"img_b64"')
+# SVG JSON 必带的格式字段，用于提前排除不可能命中的候选
+SVG_FORMAT_PATTERN = re.compile(r'"format"\s*:\s*"svg"', re.IGNORECASE)
+
+# 复用的JSON解码器（raw_decode 可从任意偏移解析并返回结束位置）
+_JSON_DECODER = json.JSONDecoder()
+
+
+def extract_svg_json_blocks(text: str) -> List[Tuple[int, int, str]]:
+    """
+    提取文本中的SVG JSON块
+    返回: [(start, end, json_string), ...]
+    """
+    # 预检：最后一个 "format": "svg" 之后不可能再有SVG JSON块，整段都没有则无需解析
+    last_format_pos = -1
+    for format_match in SVG_FORMAT_PATTERN.finditer(text):
+        last_format_pos = format_match.start()
+    if last_format_pos == -1:
+        return []
+
+    results = []
+    consumed = 0
+    # 单次扫描定位所有候选标记（【图形】后紧跟{ 或 "img_b64" 键），按出现顺序处理
+    for match in SVG_JSON_PATTERN.finditer(text):
+        if match.start() < consumed:
+            # 已被前一个SVG JSON块覆盖
+            continue
+
+        if match.group().startswith('【图形】'):
+            start_pos = match.start()
+            json_start = match.end()
+        else:
+            # 没有标记，向前查找最近的 {
+            brace_pos = text.rfind('{', consumed, match.start())
+            if brace_pos == -1:
+                continue
+            start_pos = brace_pos
+            json_start = brace_pos
+
+        if json_start > last_format_pos:
+            # 后续候选都不可能带有 svg 格式字段
+            break
+
+        # 从 { 开始由C实现的JSON解码器完成括号匹配与解析
+        try:
+            data, json_end = _JSON_DECODER.raw_decode(text, json_start)
+        except json.JSONDecodeError:
+            # 非合法JSON时括号匹配结果也无法使用，直接跳过，无需逐字符扫描的回退路径
+            continue
+
+        # 验证是否是SVG JSON
+        if isinstance(data, dict) and 'img_b64' in data and data.get('format', '').lower() == 'svg':
+            results.append((start_pos, json_end, text[json_start:json_end]))
+            consumed = json_end
+
+    return results
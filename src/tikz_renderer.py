@@ -5,17 +5,35 @@ TikZ图形渲染器
 将TikZ代码渲染为图片
 """
 
+import hashlib
 import os
 import re
+import shutil
 import logging
 import subprocess
 import tempfile
+from io import BytesIO
 from pathlib import Path
-from typing import Optional
+from typing import Dict, List, Optional, Tuple
 from PIL import Image
 
 logger = logging.getLogger(__name__)
 
+# LaTeX文档模板（模块级常量，避免每次渲染重新构造）
+_LATEX_PREAMBLE = r"""
+\documentclass[tikz,border=10pt]{standalone}
+\usepackage{tikz}
+\usetikzlibrary{3d,arrows,calc,decorations.markings,decorations.pathreplacing,angles,quotes}
+
+\begin{document}
+"""
+_LATEX_POSTAMBLE = r"""
+\end{document}
+"""
+
+# 临时编译目录：/dev/shm 可用时使用内存文件系统
+_TMP_ROOT = '/dev/shm' if os.path.isdir('/dev/shm') else None
+
 
 class TikZRenderer:
     """TikZ代码渲染器"""
@@ -38,6 +56,11 @@ class TikZRenderer:
         tikz_config = self.graphics_config.get('tikz', {})
         self.latex_command = tikz_config.get('latex_command', 'pdflatex')
         self.convert_dpi = tikz_config.get('convert_dpi', 300)
+        self.output_format = tikz_config.get('output_format', 'png')
+
+        # 渲染结果磁盘缓存（按代码和渲染参数的哈希命名），默认禁用，配置目录后启用
+        cache_dir = tikz_config.get('cache_dir')
+        self.cache_dir: Optional[Path] = Path(os.path.expanduser(cache_dir)) if cache_dir else None
 
         # 检查依赖
         self._check_dependencies()
@@ -45,32 +68,25 @@ class TikZRenderer:
         logger.info("TikZRenderer initialized (enabled=%s)", self.enabled)
 
     def _check_dependencies(self):
-        """检查必要的依赖是否安装"""
+        """检查必要的依赖是否安装（仅扫描PATH，不启动子进程）"""
         if not self.enabled:
             return
 
         # 检查pdflatex
-        try:
-            subprocess.run([self.latex_command, '--version'],
-                          stdout=subprocess.PIPE,
-                          stderr=subprocess.PIPE,
-                          timeout=5)
-            logger.info("LaTeX command '%s' is available", self.latex_command)
-        except (subprocess.SubprocessError, FileNotFoundError):
+        if shutil.which(self.latex_command) is None:
             logger.warning("LaTeX command '%s' not found, TikZ rendering disabled",
                           self.latex_command)
             self.enabled = False
             return
+        logger.info("LaTeX command '%s' is available", self.latex_command)
 
-        # 检查convert (ImageMagick)
-        try:
-            subprocess.run(['convert', '--version'],
-                          stdout=subprocess.PIPE,
-                          stderr=subprocess.PIPE,
-                          timeout=5)
+        # 检查PDF转PNG工具
+        if shutil.which('pdftoppm') is not None:
+            logger.info("Poppler 'pdftoppm' is available")
+        elif shutil.which('convert') is not None:
             logger.info("ImageMagick 'convert' is available")
-        except (subprocess.SubprocessError, FileNotFoundError):
-            logger.warning("ImageMagick 'convert' not found, will try dvipng")
+        else:
+            logger.warning("Neither 'pdftoppm' nor 'convert' found, PDF to PNG conversion will fail")
 
     def extract_tikz_blocks(self, content: str) -> list:
         """
@@ -96,16 +112,16 @@ class TikZRenderer:
 
         return blocks
 
-    def render_tikz_to_image(self, tikz_code: str, output_path: Optional[str] = None) -> Optional[Image.Image]:
+    def render_tikz(self, tikz_code: str, output_format: Optional[str] = None) -> Optional[Tuple[str, bytes]]:
         """
-        将TikZ代码渲染为图片
+        将TikZ代码渲染为图像字节，不经过PIL解码
 
         Args:
             tikz_code: TikZ代码
-            output_path: 输出路径（可选）
+            output_format: 输出格式 'png' 或 'svg'（默认使用配置值）
 
         Returns:
-            PIL Image对象，如果失败返回None
+            (格式, 字节数据) 元组，如果失败返回None
         """
         if not self.enabled:
             logger.warning("TikZ rendering is disabled")
@@ -115,83 +131,281 @@ class TikZRenderer:
             logger.error("TikZ code missing begin/end environment; skipping render")
             return None
 
-        # 创建临时目录
-        with tempfile.TemporaryDirectory() as tmpdir:
-            tmpdir_path = Path(tmpdir)
+        fmt = (output_format or self.output_format).lower()
+
+        # 磁盘缓存命中则跳过LaTeX编译
+        cache_path = self._cache_path(tikz_code, fmt)
+        cached = self._read_cache(cache_path)
+        if cached is not None:
+            logger.debug("Using cached %s for TikZ figure", fmt.upper())
+            return fmt, cached
+
+        rendered = self._render_uncached(tikz_code, fmt)
 
-            # 创建完整的LaTeX文档
-            latex_doc = self._create_latex_document(tikz_code)
+        # SVG转换失败时会退回PNG，只缓存与请求格式一致的结果
+        if rendered is not None and rendered[0] == fmt:
+            self._write_cache(cache_path, rendered[1])
 
-            # 写入LaTeX文件
-            tex_file = tmpdir_path / "tikz_figure.tex"
-            with open(tex_file, 'w', encoding='utf-8') as f:
-                f.write(latex_doc)
+        return rendered
+
+    def _render_uncached(self, tikz_code: str, fmt: str) -> Optional[Tuple[str, bytes]]:
+        """
+        编译TikZ代码并转换为指定格式
+
+        Args:
+            tikz_code: TikZ代码
+            fmt: 输出格式 'png' 或 'svg'
+
+        Returns:
+            (格式, 字节数据) 元组，如果失败返回None
+        """
+        # 创建临时目录（优先放在内存文件系统上，减少磁盘I/O）
+        with tempfile.TemporaryDirectory(dir=_TMP_ROOT) as tmpdir:
+            tmpdir_path = Path(tmpdir)
 
-            # 编译LaTeX
             try:
-                logger.info("Compiling LaTeX document...")
-                result = subprocess.run(
-                    [self.latex_command, '-interaction=nonstopmode', 'tikz_figure.tex'],
-                    cwd=tmpdir,
-                    stdout=subprocess.PIPE,
-                    stderr=subprocess.PIPE,
-                    timeout=30
-                )
-
-                if result.returncode != 0:
-                    logger.error("LaTeX compilation failed (return code: %d)", result.returncode)
-
-                    # 输出详细的错误信息
-                    stdout_text = result.stdout.decode('utf-8', errors='ignore')
-                    stderr_text = result.stderr.decode('utf-8', errors='ignore')
-
-                    # 从stdout中提取关键错误信息
-                    error_lines = []
-                    for line in stdout_text.split('\n'):
-                        if '!' in line or 'Error' in line or 'error' in line:
-                            error_lines.append(line)
-
-                    if error_lines:
-                        logger.error("LaTeX errors found:")
-                        for line in error_lines[:10]:  # 只显示前10个错误
-                            logger.error("  %s", line.strip())
-
-                    logger.debug("Full stdout (first 1000 chars): %s", stdout_text[:1000])
-                    logger.debug("Full stderr: %s", stderr_text)
+                pdf_file = self._compile_latex(tmpdir_path, self._create_latex_document(tikz_code))
+                if pdf_file is None:
                     return None
 
+                # 矢量输出：跳过300DPI整页光栅化
+                if fmt == 'svg':
+                    svg_bytes = self._convert_pdf_to_svg(pdf_file)
+                    if svg_bytes:
+                        return 'svg', svg_bytes
+                    logger.warning("SVG conversion failed, falling back to PNG")
+
                 # 转换PDF为PNG
-                pdf_file = tmpdir_path / "tikz_figure.pdf"
-                if not pdf_file.exists():
-                    logger.error("PDF file not generated")
+                png_bytes = self._convert_pdf_to_png(pdf_file)
+
+                if not png_bytes:
+                    logger.error("PNG data not generated")
                     return None
 
-                png_file = tmpdir_path / "tikz_figure.png"
-                self._convert_pdf_to_png(pdf_file, png_file)
+                return 'png', png_bytes
 
-                if not png_file.exists():
-                    logger.error("PNG file not generated")
-                    return None
+            except subprocess.TimeoutExpired:
+                logger.error("LaTeX compilation timeout")
+                return None
+            except Exception as e:
+                logger.error("TikZ rendering failed: %s", str(e))
+                import traceback
+                logger.debug(traceback.format_exc())
+                return None
+
+    def render_tikz_batch(self, tikz_codes: List[str]) -> List[Optional[Image.Image]]:
+        """
+        一次LaTeX编译渲染多段TikZ代码
+
+        standalone文档类的tikz选项会让每个tikzpicture单独成页，编译后按页拆分为PNG。
+        任一段代码出错会导致整批编译失败，此时退回逐段渲染。
+
+        用作预热时需要启用磁盘缓存（graphics.tikz.cache_dir）：结果写入缓存后，
+        对相同代码调用 render_tikz(..., 'png') 才会直接命中；缓存禁用时结果只通过返回值提供，
+        之后的 render_tikz 仍会重新编译。
+
+        Args:
+            tikz_codes: TikZ代码列表
+
+        Returns:
+            与输入一一对应的PIL Image列表，渲染失败的位置为None
+        """
+        if not self.enabled:
+            logger.warning("TikZ rendering is disabled")
+            return [None] * len(tikz_codes)
+
+        # 去重并跳过缺少环境的代码（逐段渲染时它们同样会被拒绝）
+        batch_codes = [
+            code for code in dict.fromkeys(tikz_codes)
+            if '\\begin{tikzpicture}' in code and '\\end{tikzpicture}' in code
+        ]
+
+        # 磁盘缓存命中的代码不参与编译
+        png_by_code: Dict[str, bytes] = {}
+        to_compile = []
+        for code in batch_codes:
+            cached = self._read_cache(self._cache_path(code, 'png'))
+            if cached is not None:
+                png_by_code[code] = cached
+            else:
+                to_compile.append(code)
+
+        if to_compile:
+            pages = self._render_batch_pages(to_compile)
+            if pages is None or len(pages) != len(to_compile):
+                logger.warning("Batch TikZ rendering failed, falling back to per-figure rendering")
+                return [self.render_tikz_to_image(code) for code in tikz_codes]
+
+            for code, png_bytes in zip(to_compile, pages):
+                png_by_code[code] = png_bytes
+                self._write_cache(self._cache_path(code, 'png'), png_bytes)
+            logger.info("Rendered %d TikZ figures in one LaTeX run", len(to_compile))
+
+        return [
+            Image.open(BytesIO(png_by_code[code])) if code in png_by_code else None
+            for code in tikz_codes
+        ]
+
+    def _render_batch_pages(self, tikz_codes: List[str]) -> Optional[List[bytes]]:
+        """
+        把多段TikZ代码编译进同一个文档，返回每页的PNG字节
 
-                # 读取图片
-                image = Image.open(png_file)
+        Args:
+            tikz_codes: TikZ代码列表（每段恰好一个tikzpicture）
 
-                # 如果指定了输出路径，保存图片
-                if output_path:
-                    image.save(output_path)
-                    logger.info("TikZ image saved to %s", output_path)
+        Returns:
+            按页顺序排列的PNG字节列表，如果失败返回None
+        """
+        with tempfile.TemporaryDirectory(dir=_TMP_ROOT) as tmpdir:
+            tmpdir_path = Path(tmpdir)
 
-                return image
+            try:
+                latex_doc = _LATEX_PREAMBLE + '\n'.join(tikz_codes) + _LATEX_POSTAMBLE
+                pdf_file = self._compile_latex(tmpdir_path, latex_doc)
+                if pdf_file is None:
+                    return None
+                return self._split_pdf_to_png_pages(pdf_file)
 
             except subprocess.TimeoutExpired:
                 logger.error("LaTeX compilation timeout")
                 return None
             except Exception as e:
-                logger.error("TikZ rendering failed: %s", str(e))
+                logger.error("Batch TikZ rendering failed: %s", str(e))
                 import traceback
                 logger.debug(traceback.format_exc())
                 return None
 
+    def _compile_latex(self, tmpdir_path: Path, latex_doc: str) -> Optional[Path]:
+        """
+        在临时目录中编译LaTeX文档
+
+        Args:
+            tmpdir_path: 临时目录
+            latex_doc: 完整的LaTeX文档
+
+        Returns:
+            生成的PDF路径，如果失败返回None
+        """
+        # 写入LaTeX文件（预先编码，一次系统调用写入）
+        tex_file = tmpdir_path / "tikz_figure.tex"
+        fd = os.open(str(tex_file), os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        try:
+            os.write(fd, latex_doc.encode('utf-8'))
+        finally:
+            os.close(fd)
+
+        # 编译LaTeX
+        logger.info("Compiling LaTeX document...")
+        result = subprocess.run(
+            [self.latex_command, '-interaction=nonstopmode', 'tikz_figure.tex'],
+            cwd=str(tmpdir_path),
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            timeout=30
+        )
+
+        if result.returncode != 0:
+            logger.error("LaTeX compilation failed (return code: %d)", result.returncode)
+
+            # 输出详细的错误信息
+            stdout_text = result.stdout.decode('utf-8', errors='ignore')
+            stderr_text = result.stderr.decode('utf-8', errors='ignore')
+
+            # 从stdout中提取关键错误信息
+            error_lines = []
+            for line in stdout_text.split('\n'):
+                if '!' in line or 'Error' in line or 'error' in line:
+                    error_lines.append(line)
+
+            if error_lines:
+                logger.error("LaTeX errors found:")
+                for line in error_lines[:10]:  # 只显示前10个错误
+                    logger.error("  %s", line.strip())
+
+            logger.debug("Full stdout (first 1000 chars): %s", stdout_text[:1000])
+            logger.debug("Full stderr: %s", stderr_text)
+            return None
+
+        pdf_file = tmpdir_path / "tikz_figure.pdf"
+        if not pdf_file.exists():
+            logger.error("PDF file not generated")
+            return None
+
+        return pdf_file
+
+    def render_tikz_to_image(self, tikz_code: str, output_path: Optional[str] = None) -> Optional[Image.Image]:
+        """
+        将TikZ代码渲染为图片
+
+        Args:
+            tikz_code: TikZ代码
+            output_path: 输出路径（可选）
+
+        Returns:
+            PIL Image对象，如果失败返回None
+        """
+        rendered = self.render_tikz(tikz_code, output_format='png')
+        if rendered is None:
+            return None
+
+        # 直接从内存读取图片
+        image = Image.open(BytesIO(rendered[1]))
+
+        # 如果指定了输出路径，保存图片
+        if output_path:
+            image.save(output_path)
+            logger.info("TikZ image saved to %s", output_path)
+
+        return image
+
+    def _cache_path(self, tikz_code: str, fmt: str) -> Optional[Path]:
+        """
+        计算渲染结果的缓存路径（代码、格式、DPI、LaTeX命令和模板共同决定）
+
+        Args:
+            tikz_code: TikZ代码
+            fmt: 输出格式
+
+        Returns:
+            缓存文件路径，未启用缓存时返回None
+        """
+        if self.cache_dir is None:
+            return None
+
+        hasher = hashlib.blake2b(digest_size=16)
+        hasher.update(f"{fmt}\0{self.convert_dpi}\0{self.latex_command}\0".encode('utf-8'))
+        hasher.update(_LATEX_PREAMBLE.encode('utf-8'))
+        hasher.update(tikz_code.encode('utf-8'))
+        return self.cache_dir / f"{hasher.hexdigest()}.{fmt}"
+
+    @staticmethod
+    def _read_cache(cache_path: Optional[Path]) -> Optional[bytes]:
+        """读取缓存文件，不存在或读取失败时返回None"""
+        if cache_path is None:
+            return None
+        try:
+            return cache_path.read_bytes()
+        except OSError:
+            return None
+
+    @staticmethod
+    def _write_cache(cache_path: Optional[Path], data: bytes):
+        """原子写入缓存文件（先写临时文件再替换），失败时只记录日志"""
+        if cache_path is None:
+            return
+        try:
+            cache_path.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp_name = tempfile.mkstemp(dir=str(cache_path.parent), suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(data)
+                os.replace(tmp_name, cache_path)
+            except BaseException:
+                os.unlink(tmp_name)
+                raise
+        except OSError as e:
+            logger.debug("Failed to write TikZ cache %s: %s", cache_path, e)
+
     def _create_latex_document(self, tikz_code: str) -> str:
         """
         创建完整的LaTeX文档
@@ -202,54 +416,150 @@ class TikZRenderer:
         Returns:
             完整的LaTeX文档
         """
-        return r"""
-\documentclass[tikz,border=10pt]{standalone}
-\usepackage{tikz}
-\usetikzlibrary{3d,arrows,calc,decorations.markings,decorations.pathreplacing,angles,quotes}
+        return _LATEX_PREAMBLE + tikz_code + _LATEX_POSTAMBLE
 
-\begin{document}
-""" + tikz_code + r"""
-\end{document}
-"""
+    def _convert_pdf_to_png(self, pdf_file: Path) -> Optional[bytes]:
+        """
+        将PDF转换为PNG（通过管道传递，不落盘）
+
+        Args:
+            pdf_file: PDF文件路径
+
+        Returns:
+            PNG字节数据，如果失败返回None
+        """
+        pdf_bytes = pdf_file.read_bytes()
+
+        # 尝试使用pdftoppm（从stdin读取PDF，向stdout输出PNG）
+        try:
+            result = subprocess.run(
+                ['pdftoppm', '-png', '-r', str(self.convert_dpi), '-singlefile', '-'],
+                input=pdf_bytes,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                timeout=30,
+                check=True
+            )
+            if result.stdout:
+                logger.debug("PDF converted to PNG using pdftoppm")
+                return result.stdout
+        except (subprocess.SubprocessError, FileNotFoundError):
+            logger.debug("pdftoppm failed, trying ImageMagick convert")
+
+        # 尝试使用convert (ImageMagick)
+        try:
+            result = subprocess.run(
+                ['convert', '-density', str(self.convert_dpi), 'pdf:-', 'png:-'],
+                input=pdf_bytes,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                timeout=30,
+                check=True
+            )
+            if result.stdout:
+                logger.debug("PDF converted to PNG using ImageMagick")
+                return result.stdout
+        except (subprocess.SubprocessError, FileNotFoundError):
+            pass
+
+        logger.error("Failed to convert PDF to PNG")
+        return None
 
-    def _convert_pdf_to_png(self, pdf_file: Path, png_file: Path):
+    def _split_pdf_to_png_pages(self, pdf_file: Path) -> Optional[List[bytes]]:
         """
-        将PDF转换为PNG
+        将多页PDF逐页转换为PNG
 
         Args:
             pdf_file: PDF文件路径
-            png_file: PNG文件路径
+
+        Returns:
+            按页顺序排列的PNG字节列表，如果失败返回None
         """
+        out_dir = pdf_file.parent
+
+        def _collect_pages() -> List[bytes]:
+            # pdftoppm 输出 page-1.png（页数多时补零），ImageMagick 输出 page-0.png
+            pages = sorted(out_dir.glob('page-*.png'),
+                           key=lambda p: int(p.stem.rpartition('-')[2]))
+            return [p.read_bytes() for p in pages]
+
+        # 尝试使用pdftoppm
+        try:
+            subprocess.run(
+                ['pdftoppm', '-png', '-r', str(self.convert_dpi), pdf_file.name, 'page'],
+                cwd=str(out_dir),
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                timeout=30,
+                check=True
+            )
+            pages = _collect_pages()
+            if pages:
+                logger.debug("PDF split into %d PNG pages using pdftoppm", len(pages))
+                return pages
+        except (subprocess.SubprocessError, FileNotFoundError):
+            logger.debug("pdftoppm failed, trying ImageMagick convert")
+
         # 尝试使用convert (ImageMagick)
         try:
             subprocess.run(
-                ['convert', '-density', str(self.convert_dpi),
-                 str(pdf_file), str(png_file)],
+                ['convert', '-density', str(self.convert_dpi), pdf_file.name, 'page-%d.png'],
+                cwd=str(out_dir),
                 stdout=subprocess.PIPE,
                 stderr=subprocess.PIPE,
                 timeout=30,
                 check=True
             )
-            logger.debug("PDF converted to PNG using ImageMagick")
-            return
+            pages = _collect_pages()
+            if pages:
+                logger.debug("PDF split into %d PNG pages using ImageMagick", len(pages))
+                return pages
         except (subprocess.SubprocessError, FileNotFoundError):
-            logger.debug("ImageMagick convert failed, trying pdftoppm")
+            pass
 
-        # 尝试使用pdftoppm
+        logger.error("Failed to split PDF into PNG pages")
+        return None
+
+    def _convert_pdf_to_svg(self, pdf_file: Path) -> Optional[bytes]:
+        """
+        将PDF转换为SVG（矢量，无需光栅化）
+
+        Args:
+            pdf_file: PDF文件路径
+
+        Returns:
+            SVG字节数据，如果失败返回None
+        """
+        # 尝试使用dvisvgm（直接输出到stdout）
+        try:
+            result = subprocess.run(
+                ['dvisvgm', '--pdf', '--no-fonts', '--exact-bbox', '--stdout', str(pdf_file)],
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                timeout=30,
+                check=True
+            )
+            if result.stdout:
+                logger.debug("PDF converted to SVG using dvisvgm")
+                return result.stdout
+        except (subprocess.SubprocessError, FileNotFoundError):
+            logger.debug("dvisvgm failed, trying pdf2svg")
+
+        # 尝试使用pdf2svg
+        svg_file = pdf_file.with_suffix('.svg')
         try:
             subprocess.run(
-                ['pdftoppm', '-png', '-r', str(self.convert_dpi),
-                 str(pdf_file), str(png_file.with_suffix(''))],
+                ['pdf2svg', str(pdf_file), str(svg_file)],
                 stdout=subprocess.PIPE,
                 stderr=subprocess.PIPE,
                 timeout=30,
                 check=True
             )
-            # pdftoppm会生成带后缀的文件
-            generated_file = png_file.with_name(png_file.stem + '-1.png')
-            if generated_file.exists():
-                generated_file.rename(png_file)
-            logger.debug("PDF converted to PNG using pdftoppm")
-            return
+            if svg_file.exists():
+                logger.debug("PDF converted to SVG using pdf2svg")
+                return svg_file.read_bytes()
         except (subprocess.SubprocessError, FileNotFoundError):
-            logger.error("Failed to convert PDF to PNG")
+            pass
+
+        logger.debug("Failed to convert PDF to SVG")
+        return None
@@ -3,6 +3,7 @@
 """测试文档生成功能"""
 
 import sys
+import functools
 import yaml
 from pathlib import Path
 
@@ -13,6 +14,14 @@ sys.path.insert(0, str(Path(__file__).parent))
 import src.document_generator as dg_module
 from docx import Document as DocxDocument
 
+
+@functools.lru_cache(maxsize=None)
+def load_config(path: Path) -> dict:
+    """加载配置文件（同一会话内只解析一次）"""
+    with open(path, 'rb') as f:
+        return yaml.safe_load(f)
+
+
 print("=" * 80)
 print("测试文档生成功能")
 print("=" * 80)
@@ -20,15 +29,14 @@ print("=" * 80)
 # 1. 读取配置
 print("\n步骤1: 加载配置文件")
 config_path = Path(__file__).parent / 'config' / 'config.yaml'
-with open(config_path, 'r', encoding='utf-8') as f:
-    config = yaml.safe_load(f)
+config = load_config(config_path)
 print(f"✓ 配置文件加载成功: {config_path}")
 
-# 2. 读取LLM输出
+# 2. 读取LLM输出（按字节读取后一次性解码）
 print("\n步骤2: 读取LLM输出文件")
 llmout_path = Path(__file__).parent / 'llmout'
-with open(llmout_path, 'r', encoding='utf-8') as f:
-    llm_output = f.read()
+with open(llmout_path, 'rb') as f:
+    llm_output = f.read().decode('utf-8')
 print(f"✓ LLM输出读取成功: {len(llm_output)} 字符")
 
 # 3. 使用新的提取函数检测SVG JSON
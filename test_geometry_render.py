@@ -3,6 +3,8 @@
 
 import sys
 import logging
+from io import BytesIO
+from pathlib import Path
 
 # 直接导入模块
 sys.path.insert(0, '/mnt/vdb/dev/advanceOCR')
@@ -12,6 +14,9 @@ from src.geometry_renderer import GeometryRenderer, parse_geometry_json
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+OUTPUT_DIR = Path('output')
+OUTPUT_DIR.mkdir(exist_ok=True)
+
 # 测试内容（模拟LLM输出）
 test_content = """【题目】
 1. （0分）（2016高二上·重庆期中）如图所示，平面四边形 $ ADEF $ 与梯形 $ ABCD $ 所在的平面互相垂直，$ AD \\perp CD $，$ AD \\perp ED $，$ AF \\parallel DE $，$ AB \\parallel CD $，$ CD = 2AB = 2AD = 2ED = xAF $。
@@ -45,9 +50,10 @@ def test_parse():
 
     elements = parse_geometry_json(test_content)
     if elements:
-        logger.info(f"成功解析 {len(elements)} 个几何元素")
-        for i, elem in enumerate(elements):
-            logger.info(f"  元素 {i+1}: {elem['type']}")
+        logger.info("成功解析 %d 个几何元素", len(elements))
+        if logger.isEnabledFor(logging.INFO):
+            for i, elem in enumerate(elements):
+                logger.info("  元素 %d: %s", i + 1, elem['type'])
     else:
         logger.error("解析失败")
 
@@ -66,15 +72,17 @@ def test_render(elements):
     try:
         renderer = GeometryRenderer(width=800, height=600, padding=40)
         image = renderer.render_to_pil(elements)
-        logger.info(f"渲染成功: {image.size}")
+        logger.info("渲染成功: %s", image.size)
 
         # 保存测试图片
-        output_path = "output/geometry_test.png"
-        image.save(output_path)
-        logger.info(f"测试图片已保存: {output_path}")
+        output_path = OUTPUT_DIR / "geometry_test.png"
+        buffer = BytesIO()
+        image.save(buffer, format='PNG', compress_level=1)
+        output_path.write_bytes(buffer.getvalue())
+        logger.info("测试图片已保存: %s", output_path)
 
     except Exception as e:
-        logger.error(f"渲染失败: {e}", exc_info=True)
+        logger.error("渲染失败: %s", e, exc_info=True)
 
 if __name__ == "__main__":
     # 执行测试
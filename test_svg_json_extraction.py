@@ -2,11 +2,16 @@
 # -*- coding: utf-8 -*-
 """测试SVG JSON提取功能"""
 
-import json
 import sys
+
+try:
+    from orjson import loads as json_loads  # 长字符串负载解析更快
+except ImportError:  # pragma: no cover - optional dependency
+    from json import loads as json_loads
+
 sys.path.insert(0, '/mnt/vdb/dev/advanceOCR/src')
 
-from document_generator import DocumentGenerator
+from svg_extract import extract_svg_json_blocks
 
 # 测试用例1：短Base64字符串
 test_text_1 = '''【图形】
@@ -17,10 +22,12 @@ test_text_1 = '''【图形】
 
 # 测试用例2：超长Base64字符串（模拟实际情况）
 long_b64 = "A" * 10000  # 10000个字符的Base64字符串
-test_text_2 = '【图形】\n' + '{"img_b64": "' + long_b64 + '", "format": "svg"}\n\n这是一些文字。\n'
+# 测试2、3共用同一个JSON负载，避免重复拼接长字符串
+long_payload = f'{{"img_b64": "{long_b64}", "format": "svg"}}'
+test_text_2 = f'【图形】\n{long_payload}\n\n这是一些文字。\n'
 
 # 测试用例3：没有【图形】标记
-test_text_3 = '前面的文字\n{"img_b64": "' + long_b64 + '", "format": "svg"}\n后面的文字\n'
+test_text_3 = f'前面的文字\n{long_payload}\n后面的文字\n'
 
 print("=" * 80)
 print("测试SVG JSON提取功能")
@@ -28,50 +35,59 @@ print("=" * 80)
 
 # 测试1
 print("\n测试1: 短Base64字符串")
-blocks_1 = DocumentGenerator._extract_svg_json_blocks(test_text_1)
+blocks_1 = extract_svg_json_blocks(test_text_1)
 print(f"找到 {len(blocks_1)} 个SVG JSON块")
+lines = []
 for i, (start, end, json_str) in enumerate(blocks_1, 1):
-    print(f"  块 {i}: start={start}, end={end}")
+    lines.append(f"  块 {i}: start={start}, end={end}")
     try:
-        data = json.loads(json_str)
-        print(f"    ✓ JSON解析成功")
-        print(f"    img_b64长度: {len(data.get('img_b64', ''))}")
-        print(f"    format: {data.get('format')}")
+        data = json_loads(json_str)
+        lines.append(f"    ✓ JSON解析成功")
+        lines.append(f"    img_b64长度: {len(data.get('img_b64', ''))}")
+        lines.append(f"    format: {data.get('format')}")
     except Exception as e:
-        print(f"    ✗ JSON解析失败: {e}")
+        lines.append(f"    ✗ JSON解析失败: {e}")
+if lines:
+    sys.stdout.write('\n'.join(lines) + '\n')
 
 # 测试2
 print("\n测试2: 超长Base64字符串 (10000字符)")
-blocks_2 = DocumentGenerator._extract_svg_json_blocks(test_text_2)
+blocks_2 = extract_svg_json_blocks(test_text_2)
 print(f"找到 {len(blocks_2)} 个SVG JSON块")
+lines = []
 for i, (start, end, json_str) in enumerate(blocks_2, 1):
-    print(f"  块 {i}: start={start}, end={end}")
+    lines.append(f"  块 {i}: start={start}, end={end}")
     try:
-        data = json.loads(json_str)
-        print(f"    ✓ JSON解析成功")
-        print(f"    img_b64长度: {len(data.get('img_b64', ''))}")
-        print(f"    format: {data.get('format')}")
+        data = json_loads(json_str)
+        lines.append(f"    ✓ JSON解析成功")
+        lines.append(f"    img_b64长度: {len(data.get('img_b64', ''))}")
+        lines.append(f"    format: {data.get('format')}")
         # 验证Base64是否完整
         if data.get('img_b64') == long_b64:
-            print(f"    ✓ Base64字符串完整匹配")
+            lines.append(f"    ✓ Base64字符串完整匹配")
         else:
-            print(f"    ✗ Base64字符串不匹配")
+            lines.append(f"    ✗ Base64字符串不匹配")
     except Exception as e:
-        print(f"    ✗ JSON解析失败: {e}")
+        lines.append(f"    ✗ JSON解析失败: {e}")
+if lines:
+    sys.stdout.write('\n'.join(lines) + '\n')
 
 # 测试3
 print("\n测试3: 没有【图形】标记")
-blocks_3 = DocumentGenerator._extract_svg_json_blocks(test_text_3)
+blocks_3 = extract_svg_json_blocks(test_text_3)
 print(f"找到 {len(blocks_3)} 个SVG JSON块")
+lines = []
 for i, (start, end, json_str) in enumerate(blocks_3, 1):
-    print(f"  块 {i}: start={start}, end={end}")
+    lines.append(f"  块 {i}: start={start}, end={end}")
     try:
-        data = json.loads(json_str)
-        print(f"    ✓ JSON解析成功")
-        print(f"    img_b64长度: {len(data.get('img_b64', ''))}")
-        print(f"    format: {data.get('format')}")
+        data = json_loads(json_str)
+        lines.append(f"    ✓ JSON解析成功")
+        lines.append(f"    img_b64长度: {len(data.get('img_b64', ''))}")
+        lines.append(f"    format: {data.get('format')}")
     except Exception as e:
-        print(f"    ✗ JSON解析失败: {e}")
+        lines.append(f"    ✗ JSON解析失败: {e}")
+if lines:
+    sys.stdout.write('\n'.join(lines) + '\n')
 
 print("\n" + "=" * 80)
 print("测试完成")
@@ -3,8 +3,15 @@
 """测试 SVG-in-JSON 格式解析和渲染"""
 
 import json
+import os
 import re
 from io import BytesIO
+
+try:
+    from orjson import loads as json_loads  # 长字符串负载解析更快
+except ImportError:  # pragma: no cover - optional dependency
+    from json import loads as json_loads
+
 from PIL import Image
 from docx import Document
 from docx.shared import Inches
@@ -25,7 +32,7 @@ def parse_svg_json(content: str) -> tuple[str, str]:
         tuple: (text, svg_content)
     """
     try:
-        data = json.loads(content)
+        data = json_loads(content)
         text = data.get('text', '')
         svg_content = data.get('figure_svg', '')
         return text, svg_content
@@ -38,6 +45,9 @@ def svg_to_png(svg_content: str, output_width: int = 800) -> Image.Image:
     """
     将 SVG 转换为 PNG 图像
 
+    优先使用 resvg-py（Rust 原生解析+光栅化），未安装时回退到 cairosvg。
+    可通过环境变量 P2D_SVG_BACKEND=resvg|cairosvg 强制指定后端，便于对比测试。
+
     Args:
         svg_content: SVG 字符串
         output_width: 输出宽度（像素）
@@ -45,12 +55,27 @@ def svg_to_png(svg_content: str, output_width: int = 800) -> Image.Image:
     Returns:
         PIL Image object
     """
+    backend = os.environ.get('P2D_SVG_BACKEND', '').lower()
+
     try:
-        import cairosvg
+        png_bytes = None
+
+        if backend != 'cairosvg':
+            try:
+                import resvg_py
+                png_bytes = bytes(resvg_py.svg_to_bytes(svg_string=svg_content,
+                                                        width=output_width))
+            except ImportError:
+                if backend == 'resvg':
+                    print("resvg-py 未安装，请运行: uv pip install resvg-py")
+                    raise
+
+        if png_bytes is None:
+            import cairosvg
 
-        # 转换 SVG 到 PNG bytes
-        png_bytes = cairosvg.svg2png(bytestring=svg_content.encode('utf-8'),
-                                      output_width=output_width)
+            # 转换 SVG 到 PNG bytes
+            png_bytes = cairosvg.svg2png(bytestring=svg_content.encode('utf-8'),
+                                          output_width=output_width)
 
         # 转换为 PIL Image
         image = Image.open(BytesIO(png_bytes))
@@ -78,9 +103,9 @@ def create_word_document(text: str, image: Image.Image, output_path: str):
     # 添加题目文字
     doc.add_paragraph(text)
 
-    # 添加图片
+    # 添加图片（中间 PNG 会再被 docx 压缩打包，用最快的 deflate 级别编码一次即可）
     image_stream = BytesIO()
-    image.save(image_stream, format='PNG')
+    image.save(image_stream, format='PNG', optimize=False, compress_level=1)
     image_stream.seek(0)
 
     paragraph = doc.add_paragraph()
@@ -3,10 +3,15 @@ import json
 import logging
 import sys
 import importlib.util
+from io import BytesIO
+from pathlib import Path
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+OUTPUT_DIR = Path('output')
+OUTPUT_DIR.mkdir(exist_ok=True)
+
 # 导入geometry_renderer模块
 spec = importlib.util.spec_from_file_location('geometry_renderer', '/mnt/vdb/dev/advanceOCR/src/geometry_renderer.py')
 module = importlib.util.module_from_spec(spec)
@@ -44,11 +49,12 @@ logger.info('=' * 80)
 # 解析
 elements = parse_geometry_json(test_content)
 if elements:
-    logger.info(f'✓ 成功解析 {len(elements)} 个几何元素')
-    for i, elem in enumerate(elements[:5]):
-        logger.info(f'  元素 {i+1}: {elem}')
-    if len(elements) > 5:
-        logger.info(f'  ... 还有 {len(elements)-5} 个元素')
+    logger.info('✓ 成功解析 %d 个几何元素', len(elements))
+    if logger.isEnabledFor(logging.INFO):
+        for i, elem in enumerate(elements[:5]):
+            logger.info('  元素 %d: %s', i + 1, elem)
+        if len(elements) > 5:
+            logger.info('  ... 还有 %d 个元素', len(elements) - 5)
 else:
     logger.error('✗ 解析失败')
     sys.exit(1)
@@ -58,16 +64,18 @@ try:
     logger.info('\n渲染几何图形...')
     renderer = GeometryRenderer(width=800, height=600, padding=50)
     image = renderer.render_to_pil(elements)
-    logger.info(f'✓ 渲染成功: {image.size[0]}x{image.size[1]}')
+    logger.info('✓ 渲染成功: %dx%d', image.size[0], image.size[1])
 
     # 保存
-    output_path = 'output/user_geometry.png'
-    image.save(output_path)
-    logger.info(f'✓ 已保存到: {output_path}')
+    output_path = OUTPUT_DIR / 'user_geometry.png'
+    buffer = BytesIO()
+    image.save(buffer, format='PNG', compress_level=1)
+    output_path.write_bytes(buffer.getvalue())
+    logger.info('✓ 已保存到: %s', output_path)
 
     logger.info('\n' + '=' * 80)
     logger.info('测试完成！')
     logger.info('=' * 80)
 except Exception as e:
-    logger.error(f'✗ 渲染失败: {e}', exc_info=True)
+    logger.error('✗ 渲染失败: %s', e, exc_info=True)
     sys.exit(1)
@@ -0,0 +1,13 @@
+# -*- coding: utf-8 -*-
+"""
+测试共享的 MathML 辅助函数
+"""
+
+import functools
+
+
+@functools.lru_cache(maxsize=512)
+def cached_latex_to_mathml(latex):
+    """带缓存的 LaTeX -> MathML 转换（纯函数，相同公式只转换一次）"""
+    from latex2mathml.converter import convert
+    return convert(latex)
@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+"""
+测试共享的配置与实例
+
+脚本式测试模块在导入时就会执行，通过这里带缓存的工厂函数
+（`from tests._shared import ...`）共享状态：整个测试进程只解析一次配置、
+只构造一次生成器和转换器。
+"""
+
+import functools
+import sys
+from pathlib import Path
+
+import yaml
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+CONFIG_PATH = ROOT_DIR / 'config' / 'config.yaml'
+
+# 确保可以导入项目源码
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+# 优先使用 libyaml 的 C 加载器
+_YAML_LOADER = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+
+
+@functools.lru_cache(maxsize=None)
+def load_config():
+    """加载配置（整个测试进程只解析一次）"""
+    with open(CONFIG_PATH, 'rb') as f:
+        return yaml.load(f, Loader=_YAML_LOADER)
+
+
+@functools.lru_cache(maxsize=None)
+def get_document_generator():
+    """共享的文档生成器实例"""
+    from src.document_generator import DocumentGenerator
+    return DocumentGenerator(load_config())
+
+
+@functools.lru_cache(maxsize=None)
+def get_formula_converter():
+    """共享的公式转换器实例"""
+    from src.formula_converter import FormulaConverter
+    return FormulaConverter(load_config())
+
+
+def preview(text, limit=200):
+    """截断预览：超长时截取前 limit 个字符并加省略号，短文本原样返回（不复制）"""
+    if len(text) <= limit:
+        return text
+    return text[:limit] + '...'
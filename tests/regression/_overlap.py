@@ -0,0 +1,25 @@
+# -*- coding: utf-8 -*-
+"""
+轻量测试脚本共用的重叠查找，与 AdvancedOCR._find_longest_overlap 算法一致
+
+独立脚本无法导入 src（src/__init__ 会加载完整依赖），因此放在这里供各脚本复用
+"""
+
+
+def find_longest_overlap(tail: str, candidate: str, min_overlap: int) -> int:
+    """返回 tail 后缀与 candidate 前缀的最长重叠长度（不足 min_overlap 时返回0）"""
+    tail_len = len(tail)
+    if min(tail_len, len(candidate)) < min_overlap:
+        return 0
+    # 任何合格重叠都以 candidate 的前 min_overlap 个字符开头，
+    # 用 str.find 定位锚点、str.startswith 校验剩余部分
+    anchor = candidate[:min_overlap]
+
+    # 从左向右扫描：越靠前的起点对应越长的重叠，第一个通过校验的即为最长
+    start = tail.find(anchor)
+    while start != -1:
+        if candidate.startswith(tail[start:]):
+            return tail_len - start
+        start = tail.find(anchor, start + 1)
+
+    return 0
@@ -4,19 +4,18 @@
 测试脚本 - 验证重叠内容去除和公式转换修复
 """
 
+import random
 import sys
 from pathlib import Path
 
 ROOT_DIR = Path(__file__).resolve().parents[2]
-CONFIG_PATH = ROOT_DIR / 'config' / 'config.yaml'
 
 # 确保可以导入项目源码
 if str(ROOT_DIR) not in sys.path:
     sys.path.insert(0, str(ROOT_DIR))
 
 from src.main import AdvancedOCR
-from src.formula_converter import FormulaConverter
-import yaml
+from tests._shared import get_formula_converter
 
 
 def test_overlap_removal():
@@ -62,17 +61,51 @@ def test_overlap_removal():
         return False
 
 
+def test_overlap_matches_naive():
+    """锚点重叠查找与逐长度切片比较的朴素实现结果一致"""
+    print("\n" + "="*60)
+    print("测试 1b: 锚点重叠查找 vs 朴素实现")
+    print("="*60)
+
+    def naive_overlap(tail, candidate, min_overlap, max_len):
+        tail = tail[-max_len:]
+        for overlap in range(max_len, min_overlap - 1, -1):
+            if tail[-overlap:] == candidate[:overlap]:
+                return overlap
+        return 0
+
+    rng = random.Random(20240601)
+    mismatches = 0
+    for _ in range(500):
+        # 小字母表以便频繁产生重叠
+        alphabet = 'ab' if rng.random() < 0.5 else 'abc解得x'
+        shared = ''.join(rng.choice(alphabet) for _ in range(rng.randint(0, 60)))
+        tail = ''.join(rng.choice(alphabet) for _ in range(rng.randint(0, 60))) + shared
+        candidate = shared + ''.join(rng.choice(alphabet) for _ in range(rng.randint(0, 60)))
+        max_len = min(len(tail), len(candidate), 80)
+        min_overlap = rng.randint(1, 10)
+        if max_len < min_overlap:
+            continue
+
+        expected = naive_overlap(tail, candidate, min_overlap, max_len)
+        actual = AdvancedOCR._find_longest_overlap(tail, candidate, min_overlap, max_len)
+        if actual != expected:
+            mismatches += 1
+            print(f"✗ 不一致: tail={tail!r}, candidate={candidate!r}, 期望 {expected}, 实际 {actual}")
+
+    if mismatches == 0:
+        print("✓ 测试通过: 随机输入结果与朴素实现一致")
+        return True
+    return False
+
+
 def test_aligned_formula_conversion():
     """测试aligned环境的公式转换"""
     print("\n" + "="*60)
     print("测试 2: Aligned环境公式转换")
     print("="*60)
 
-    # 加载配置
-    with open(CONFIG_PATH, 'r', encoding='utf-8') as f:
-        config = yaml.safe_load(f)
-
-    converter = FormulaConverter(config)
+    converter = get_formula_converter()
 
     # 测试包含aligned环境的公式
     test_latex = r"""
@@ -123,10 +156,7 @@ def test_multiple_aligned_formulas():
     print("测试 3: 多个Aligned公式转换")
     print("="*60)
 
-    with open(CONFIG_PATH, 'r', encoding='utf-8') as f:
-        config = yaml.safe_load(f)
-
-    converter = FormulaConverter(config)
+    converter = get_formula_converter()
 
     test_content = r"""
 这里是一些文字说明。
@@ -193,6 +223,7 @@ def main():
 
     # 测试1: 重叠内容去除
     results.append(("重叠内容去除", test_overlap_removal()))
+    results.append(("重叠查找一致性", test_overlap_matches_naive()))
 
     # 测试2: Aligned公式转换
     results.append(("Aligned公式转换", test_aligned_formula_conversion()))
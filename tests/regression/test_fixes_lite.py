@@ -6,118 +6,230 @@
 """
 
 import re
+from array import array
+from dataclasses import dataclass
+from functools import lru_cache
+from itertools import islice
+from operator import eq
+from typing import Optional
+
+from _overlap import find_longest_overlap
+
+try:
+    import numpy as np
+except ImportError:  # 轻量环境下回退到逐字符比较
+    np = None
+
+# 模块级预编译正则,避免每次调用时查找 re 的内部缓存
+# 只匹配需要改写的空白串(含制表符或连续空格),单个空格不产生替换
+_WS_RE = re.compile(r'\t[ \t]*| [ \t]+')
+_NL_RE = re.compile(r'\n{3,}')
+# aligned 块内的分行符(4个反斜杠)
+_LINE_SPLIT = '\\' * 4
+# 归一化时会被压缩的空白串(两类字符不相交,可在同一次扫描中定位)
+_COLLAPSIBLE_RE = re.compile(r'[ \t]+|\n{3,}')
+
+
+def _collapse_whitespace(text: str) -> str:
+    """压缩空白符(不做 strip);空白串不会跨过非空白字符,可分段处理后直接拼接"""
+    # 将多个空格/制表符压缩为单个空格
+    text = _WS_RE.sub(' ', text)
+    # 将多个连续换行压缩为最多两个换行(多数文本没有,先用子串查找跳过整趟正则)
+    if '\n\n\n' in text:
+        text = _NL_RE.sub('\n\n', text)
+    return text
 
 
 def normalize_for_comparison(text: str) -> str:
     """归一化文本用于重复检测:压缩空白符,但保留换行"""
-    # 将多个空格/制表符压缩为单个空格
-    text = re.sub(r'[ \t]+', ' ', text)
-    # 将多个连续换行压缩为最多两个换行
-    text = re.sub(r'\n{3,}', '\n\n', text)
-    return text.strip()
+    return _collapse_whitespace(text).strip()
+
+
+def _normalize_with_map(text: str):
+    """
+    归一化文本并返回下标映射
+
+    Returns:
+        (normalized, orig_index): orig_index[i] 为 normalized[i] 在 text 中的位置,
+        被压缩的空白串映射到该串的第一个字符
+    """
+    orig_index = array('i')
+    pos = 0
+    for match in _COLLAPSIBLE_RE.finditer(text):
+        start = match.start()
+        orig_index.extend(range(pos, start))
+        if text[start] == '\n':
+            orig_index.extend((start, start + 1))
+        else:
+            orig_index.append(start)
+        pos = match.end()
+    orig_index.extend(range(pos, len(text)))
+
+    collapsed = _collapse_whitespace(text)
+    normalized = collapsed.lstrip()
+    lead = len(collapsed) - len(normalized)
+    normalized = normalized.rstrip()
+    return normalized, orig_index[lead:lead + len(normalized)]
+
+
+@dataclass
+class OverlapState:
+    """
+    流式合并切片时缓存已合并文本的归一化结果
+
+    已合并文本只会在末尾追加,因此只需归一化新增部分:
+    以最后一个非空白字符为界,之前的归一化结果保持不变。
+    """
+    source: str = ''            # 上一次归一化的原始文本
+    core_len: int = 0           # source 中截至最后一个非空白字符的长度
+    normalized_core: str = ''   # source[:core_len] 的归一化结果(未 strip)
+
+    def normalize(self, existing: str) -> str:
+        """返回 normalize_for_comparison(existing),复用上一次的结果"""
+        if not existing.startswith(self.source):
+            # 不是追加关系,从头开始
+            self.core_len = 0
+            self.normalized_core = ''
+
+        rest = existing[self.core_len:]
+        rest_core_len = len(rest.rstrip(' \t\n'))
+        if rest_core_len:
+            self.normalized_core += _collapse_whitespace(rest[:rest_core_len])
+            self.core_len += rest_core_len
+        self.source = existing
+
+        return (self.normalized_core + _collapse_whitespace(rest[rest_core_len:])).strip()
+
+
+def _code_points(text: str):
+    """将字符串转换为码点数组,便于整段向量化比较"""
+    return np.frombuffer(text.encode('utf-32-le', 'surrogatepass'), dtype='<u4')
 
 
 def trim_overlap_text(existing: str, new_content: str, max_overlap: int = 1500,
-                     min_overlap: int = 80) -> str:
-    """去除与已合并文本重复的前缀,缓解切片重叠导致的重复"""
-    if not new_content:
-        return ""
+                     min_overlap: int = 80, state: Optional[OverlapState] = None) -> str:
+    """
+    去除与已合并文本重复的前缀,缓解切片重叠导致的重复
 
-    candidate = new_content.lstrip()
-    if not candidate:
+    流式合并时传入同一个 state,已合并文本只需增量归一化
+    """
+    if not new_content:
         return ""
 
     if not existing:
-        return candidate
-
-    existing_normalized = normalize_for_comparison(existing)
-    candidate_normalized = normalize_for_comparison(candidate)
+        return new_content.lstrip()
 
-    # 检查完全重复
-    if candidate_normalized in existing_normalized:
+    # 直接归一化 new_content(归一化本身会去掉首部空白),下标映射指向 new_content,
+    # 只在返回时切片一次,不再预先生成 lstrip 后的副本
+    candidate_normalized, candidate_index = _normalize_with_map(new_content)
+    if not candidate_normalized:
         return ""
 
+    if state is not None:
+        existing_normalized = state.normalize(existing)
+    else:
+        existing_normalized = normalize_for_comparison(existing)
+
     # 获取尾部用于比较
     existing_tail = existing_normalized[-max_overlap:]
-    max_len = min(len(existing_tail), len(candidate_normalized))
 
-    # 尝试找到最长的重叠部分
-    best_overlap_len = 0
-    for overlap in range(max_len, min_overlap - 1, -1):
-        suffix = existing_tail[-overlap:]
-        prefix = candidate_normalized[:overlap]
-
-        # 精确匹配
-        if suffix == prefix:
+    # 检查完全重复:切片重叠只发生在尾部窗口内,比窗口长的候选无需在全文中查找
+    if len(candidate_normalized) <= max_overlap and candidate_normalized in existing_tail:
+        return ""
+    max_len = min(len(existing_tail), len(candidate_normalized))
+    # 比较窗口只切片一次,循环内通过偏移比较,不再为每个长度分配子串
+    tail_window = existing_tail[-max_len:]
+    prefix_window = candidate_normalized[:max_len]
+
+    # 精确匹配:与主流程共用同一重叠查找
+    exact_overlap = find_longest_overlap(tail_window, prefix_window, min_overlap)
+
+    # 模糊匹配:允许少量差异(如空白符差异),只需检查比精确重叠更长的长度
+    best_overlap_len = exact_overlap
+    fuzzy_floor = max(exact_overlap + 1, min_overlap)
+    tail_codes = prefix_codes = None
+    if np is not None and max_len >= fuzzy_floor:
+        # 一次性转换为码点数组,每个长度的比较由 NumPy 整段完成(切片为视图)
+        tail_codes = _code_points(tail_window)
+        prefix_codes = _code_points(prefix_window)
+    for overlap in range(max_len, fuzzy_floor - 1, -1):
+        if overlap < min_overlap * 1.5:  # 只对较长的重叠做模糊匹配
+            break
+        if tail_codes is not None:
+            matches = int(np.count_nonzero(tail_codes[max_len - overlap:] == prefix_codes[:overlap]))
+        else:
+            # tail_window 从偏移处迭代到末尾恰好 overlap 个字符,map 按较短者截断
+            matches = sum(map(eq, islice(tail_window, max_len - overlap, None), prefix_window))
+        similarity = matches / overlap
+        if similarity > 0.85:  # 85%相似度
             best_overlap_len = overlap
             break
 
-        # 模糊匹配:允许少量差异(如空白符差异)
-        # 计算相似度
-        if overlap >= min_overlap * 1.5:  # 只对较长的重叠做模糊匹配
-            similarity = sum(c1 == c2 for c1, c2 in zip(suffix, prefix)) / overlap
-            if similarity > 0.85:  # 85%相似度
-                best_overlap_len = overlap
-                break
-
     if best_overlap_len > 0:
-        # 在原始文本中找到对应位置(考虑归一化可能改变了长度)
-        # 使用归一化后的位置作为参考,在原始文本中找最接近的切分点
-        remaining_normalized = candidate_normalized[best_overlap_len:].lstrip()
-
-        # 在原始candidate中找到remaining_normalized的开始位置
-        remaining_start = candidate.find(remaining_normalized[:min(50, len(remaining_normalized))])
-        if remaining_start > 0:
-            return candidate[remaining_start:].lstrip()
-        else:
-            # 回退:使用归一化长度的比例估算
-            ratio = best_overlap_len / len(candidate_normalized) if len(candidate_normalized) > 0 else 0
-            cut_pos = int(len(candidate) * ratio)
-            return candidate[cut_pos:].lstrip()
+        # 跳过重叠后的空白,再通过下标映射直接定位原始文本中的切分点
+        cut = best_overlap_len
+        normalized_len = len(candidate_normalized)
+        while cut < normalized_len and candidate_normalized[cut].isspace():
+            cut += 1
+        if cut >= normalized_len:
+            return ""
+        return new_content[candidate_index[cut]:]
+
+    return new_content[candidate_index[0]:]
 
-    return candidate
+
+_ALIGNED_BEGIN = r'\begin{aligned}'
+_ALIGNED_END = r'\end{aligned}'
 
 
 def preprocess_aligned_environment(latex: str) -> str:
     """
     预处理aligned环境,将其转换为latex2mathml能处理的格式
     """
-    # 匹配aligned环境
-    aligned_pattern = r'\\begin\{aligned\}(.*?)\\end\{aligned\}'
-
-    def process_aligned_content(match):
-        content = match.group(1)
+    # 不含aligned环境的输入直接返回,不占用缓存
+    if not latex or _ALIGNED_BEGIN not in latex:
+        return latex
+    return _preprocess_aligned_cached(latex)
+
+
+@lru_cache(maxsize=4096)
+def _preprocess_aligned_cached(latex: str) -> str:
+    """相同公式在切片和文档间经常重复出现,结果按输入缓存"""
+    begin_tag = _ALIGNED_BEGIN
+    end_tag = _ALIGNED_END
+
+    # 单次前向扫描:非aligned区域按切片原样拷贝,aligned块就地改写
+    parts = []
+    pos = 0
+    while True:
+        begin = latex.find(begin_tag, pos)
+        if begin == -1:
+            break
+        body_start = begin + len(begin_tag)
+        end = latex.find(end_tag, body_start)
+        if end == -1:
+            # 缺少结束标记时之后的 begin 也不可能闭合,剩余部分原样保留
+            break
 
-        # 移除对齐符 &
-        content = content.replace('&', '')
+        # 移除对齐符 & (行首的对齐符也随之去掉)
+        content = latex[body_start:end].replace('&', '')
 
-        # 将 \\\\ 替换为换行符,然后每行转换为独立的公式
-        lines = re.split(r'\\\\\\\\', content)  # 匹配 \\\\
-        lines = [line.strip() for line in lines if line.strip()]
+        # 按 \\\\ 分行,每行转换为独立的公式
+        lines = [line.strip() for line in content.split(_LINE_SPLIT) if line.strip()]
 
-        # 如果只有一行或内容较简单,保持原样但移除对齐符
+        parts.append(latex[pos:begin])
         if len(lines) <= 1:
-            return content.replace('&', '').strip()
-
-        # 多行内容:使用gathered环境
-        processed_lines = []
-        for line in lines:
-            line = line.strip()
-            if line:
-                # 移除行首的对齐符
-                line = re.sub(r'^\s*&\s*', '', line)
-                processed_lines.append(line)
-
-        # 使用gathered环境(类似aligned但没有对齐符)
-        if processed_lines:
-            return r'\begin{gathered}' + r'\\'.join(processed_lines) + r'\end{gathered}'
+            # 只有一行或内容较简单,保持原样但移除对齐符
+            parts.append(content.strip())
         else:
-            return content
-
-    # 替换所有aligned环境
-    result = re.sub(aligned_pattern, process_aligned_content, latex, flags=re.DOTALL)
+            # 多行内容:使用gathered环境(类似aligned但没有对齐符)
+            parts.append(r'\begin{gathered}' + r'\\'.join(lines) + r'\end{gathered}')
+        pos = end + len(end_tag)
 
-    return result
+    if not parts:
+        return latex
+    parts.append(latex[pos:])
+    return ''.join(parts)
 
 
 def test_overlap_removal():
@@ -259,6 +371,19 @@ def test_edge_cases():
         print("✗ 失败: 简单aligned环境处理失败")
         all_passed = False
 
+    # 测试3.5: 增量归一化与整体归一化一致
+    print("\n测试 3.5: 流式合并的增量归一化")
+    state = OverlapState()
+    merged = ""
+    for piece in ["第一段  文本\t\n", "\n\n\n第二段 ", "  内容\n", "结尾 \t"]:
+        merged += piece
+        if state.normalize(merged) != normalize_for_comparison(merged):
+            print(f"✗ 失败: 增量归一化结果不一致: {merged!r}")
+            all_passed = False
+            break
+    else:
+        print("✓ 通过: 增量归一化与整体归一化一致")
+
     return all_passed
 
 
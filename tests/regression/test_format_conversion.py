@@ -8,7 +8,6 @@
 
 import os
 import sys
-import yaml
 import logging
 import argparse
 from pathlib import Path
@@ -18,8 +17,7 @@ ROOT_DIR = Path(__file__).resolve().parents[2]
 if str(ROOT_DIR) not in sys.path:
     sys.path.insert(0, str(ROOT_DIR))
 
-from src.formula_converter import FormulaConverter
-from src.document_generator import DocumentGenerator
+from tests._shared import get_document_generator, get_formula_converter
 
 
 def setup_logging():
@@ -30,13 +28,6 @@ def setup_logging():
     )
 
 
-def load_config():
-    """加载配置文件"""
-    config_path = ROOT_DIR / 'config' / 'config.yaml'
-    with open(config_path, 'r', encoding='utf-8') as f:
-        return yaml.safe_load(f)
-
-
 def test_format_conversion(text: str, output_filename: str = None):
     """
     测试格式转换
@@ -47,12 +38,9 @@ def test_format_conversion(text: str, output_filename: str = None):
     """
     logger = logging.getLogger(__name__)
     
-    # 加载配置
-    config = load_config()
-    
-    # 创建转换器
-    formula_converter = FormulaConverter(config)
-    document_generator = DocumentGenerator(config)
+    # 共享的转换器（配置只解析一次）
+    formula_converter = get_formula_converter()
+    document_generator = get_document_generator()
     
     logger.info("=" * 80)
     logger.info("输入文本:")
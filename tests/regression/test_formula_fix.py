@@ -4,23 +4,17 @@
 """
 from pathlib import Path
 import sys
-import yaml
 
 ROOT_DIR = Path(__file__).resolve().parents[2]
 if str(ROOT_DIR) not in sys.path:
     sys.path.insert(0, str(ROOT_DIR))
 
-from src.document_generator import DocumentGenerator
-from src.formula_converter import FormulaConverter
 from docx import Document
+from tests._shared import get_document_generator, get_formula_converter
 
-# 加载配置
-with open(ROOT_DIR / 'config' / 'config.yaml', 'r', encoding='utf-8') as f:
-    config = yaml.safe_load(f)
-
-# 创建实例
-doc_gen = DocumentGenerator(config)
-formula_converter = FormulaConverter(config)
+# 共享实例（配置只解析一次）
+doc_gen = get_document_generator()
+formula_converter = get_formula_converter()
 
 # 测试简单公式
 test_formulas = [
@@ -4,7 +4,6 @@
 """
 import sys
 from pathlib import Path
-import yaml
 import logging
 
 # 设置日志级别为DEBUG
@@ -14,22 +13,16 @@ logging.basicConfig(
 )
 
 ROOT_DIR = Path(__file__).resolve().parents[2]
-CONFIG_PATH = ROOT_DIR / 'config' / 'config.yaml'
 
 if str(ROOT_DIR) not in sys.path:
     sys.path.insert(0, str(ROOT_DIR))
 
-from src.document_generator import DocumentGenerator
-from src.formula_converter import FormulaConverter
 from docx import Document
+from tests._shared import get_document_generator, get_formula_converter
 
-# 加载配置
-with open(CONFIG_PATH, 'r', encoding='utf-8') as f:
-    config = yaml.safe_load(f)
-
-# 创建实例
-doc_gen = DocumentGenerator(config)
-formula_converter = FormulaConverter(config)
+# 共享实例（配置只解析一次）
+doc_gen = get_document_generator()
+formula_converter = get_formula_converter()
 
 # 测试公式
 test_formulas = [
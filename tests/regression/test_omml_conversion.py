@@ -4,10 +4,25 @@
 """
 from xml.etree import ElementTree as ET
 
+OMML_NAMESPACE = 'http://schemas.openxmlformats.org/officeDocument/2006/math'
+
 def qn(tag):
     """Quick Name - 添加命名空间"""
-    namespace = 'http://schemas.openxmlformats.org/officeDocument/2006/math'
-    return f'{{{namespace}}}{tag}'
+    return f'{{{OMML_NAMESPACE}}}{tag}'
+
+# 转换中用到的限定名在导入时生成一次，避免每个节点都格式化字符串
+_QN_R = qn('r')
+_QN_T = qn('t')
+_QN_F = qn('f')
+_QN_NUM = qn('num')
+_QN_DEN = qn('den')
+_QN_SSUP = qn('sSup')
+_QN_E = qn('e')
+_QN_SUP = qn('sup')
+_QN_RAD = qn('rad')
+_QN_RADPR = qn('radPr')
+_QN_DEGHIDE = qn('degHide')
+_QN_VAL = qn('val')
 
 def test_mathml_to_omml():
     """测试简单的 MathML 到 OMML 转换"""
@@ -55,52 +70,69 @@ def test_mathml_to_omml():
             import traceback
             traceback.print_exc()
 
-def convert_element(mathml_elem, omml_parent):
-    """简单的元素转换"""
-    tag = mathml_elem.tag.split('}')[-1] if '}' in mathml_elem.tag else mathml_elem.tag
-    
-    if tag == 'math':
-        for child in mathml_elem:
-            convert_element(child, omml_parent)
-    
-    elif tag == 'mrow':
-        for child in mathml_elem:
-            convert_element(child, omml_parent)
-    
-    elif tag in ['mi', 'mn', 'mo']:
-        r = ET.SubElement(omml_parent, qn('r'))
-        t = ET.SubElement(r, qn('t'))
-        t.text = mathml_elem.text or ''
+def _h_passthrough(mathml_elem, omml_parent):
+    """math / mrow：直接转换子元素"""
+    for child in mathml_elem:
+        convert_element(child, omml_parent)
+
+def _h_leaf(mathml_elem, omml_parent):
+    """mi / mn / mo：生成文本run"""
+    r = ET.SubElement(omml_parent, _QN_R)
+    t = ET.SubElement(r, _QN_T)
+    t.text = mathml_elem.text or ''
+
+def _h_frac(mathml_elem, omml_parent):
+    """mfrac：分子、分母"""
+    f = ET.SubElement(omml_parent, _QN_F)
+    num = ET.SubElement(f, _QN_NUM)
+    den = ET.SubElement(f, _QN_DEN)
     
-    elif tag == 'mfrac':
-        f = ET.SubElement(omml_parent, qn('f'))
-        num = ET.SubElement(f, qn('num'))
-        den = ET.SubElement(f, qn('den'))
-        
-        children = list(mathml_elem)
-        if len(children) >= 2:
-            convert_element(children[0], num)
-            convert_element(children[1], den)
+    children = list(mathml_elem)
+    if len(children) >= 2:
+        convert_element(children[0], num)
+        convert_element(children[1], den)
+
+def _h_sup(mathml_elem, omml_parent):
+    """msup：底数、上标"""
+    ssup = ET.SubElement(omml_parent, _QN_SSUP)
+    e = ET.SubElement(ssup, _QN_E)
+    sup = ET.SubElement(ssup, _QN_SUP)
     
-    elif tag == 'msup':
-        ssup = ET.SubElement(omml_parent, qn('sSup'))
-        e = ET.SubElement(ssup, qn('e'))
-        sup = ET.SubElement(ssup, qn('sup'))
-        
-        children = list(mathml_elem)
-        if len(children) >= 2:
-            convert_element(children[0], e)
-            convert_element(children[1], sup)
+    children = list(mathml_elem)
+    if len(children) >= 2:
+        convert_element(children[0], e)
+        convert_element(children[1], sup)
+
+def _h_sqrt(mathml_elem, omml_parent):
+    """msqrt：隐藏根次的根式"""
+    rad = ET.SubElement(omml_parent, _QN_RAD)
+    radPr = ET.SubElement(rad, _QN_RADPR)
+    degHide = ET.SubElement(radPr, _QN_DEGHIDE)
+    degHide.set(_QN_VAL, '1')
+    e = ET.SubElement(rad, _QN_E)
     
-    elif tag == 'msqrt':
-        rad = ET.SubElement(omml_parent, qn('rad'))
-        radPr = ET.SubElement(rad, qn('radPr'))
-        degHide = ET.SubElement(radPr, qn('degHide'))
-        degHide.set(qn('val'), '1')
-        e = ET.SubElement(rad, qn('e'))
-        
-        for child in mathml_elem:
-            convert_element(child, e)
+    for child in mathml_elem:
+        convert_element(child, e)
+
+# 标签名 -> 转换函数
+_HANDLERS = {
+    'math': _h_passthrough,
+    'mrow': _h_passthrough,
+    'mi': _h_leaf,
+    'mn': _h_leaf,
+    'mo': _h_leaf,
+    'mfrac': _h_frac,
+    'msup': _h_sup,
+    'msqrt': _h_sqrt,
+}
+
+def convert_element(mathml_elem, omml_parent):
+    """简单的元素转换"""
+    # 去掉命名空间前缀（无 } 时 rfind 返回 -1，切片即整个标签）
+    elem_tag = mathml_elem.tag
+    handler = _HANDLERS.get(elem_tag[elem_tag.rfind('}') + 1:])
+    if handler is not None:
+        handler(mathml_elem, omml_parent)
 
 if __name__ == '__main__':
     test_mathml_to_omml()
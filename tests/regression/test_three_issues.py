@@ -8,24 +8,18 @@ import sys
 from pathlib import Path
 
 ROOT_DIR = Path(__file__).resolve().parents[2]
-CONFIG_PATH = ROOT_DIR / 'config' / 'config.yaml'
 
 if str(ROOT_DIR) not in sys.path:
     sys.path.insert(0, str(ROOT_DIR))
 
 from src.document_generator import DocumentGenerator
-from src.formula_converter import FormulaConverter
 from src.main import AdvancedOCR
-import yaml
+from tests._shared import get_formula_converter
 
 print("\n" + "="*70)
 print("问题修复验证测试")
 print("="*70)
 
-# 加载配置
-with open(CONFIG_PATH, 'r', encoding='utf-8') as f:
-    config = yaml.safe_load(f)
-
 # 测试1: f'(x) 不应该变成 f'}(x)
 print("\n" + "-"*70)
 print("测试1: Prime符号标准化")
@@ -51,7 +45,7 @@ print("\n" + "-"*70)
 print("测试2: LLM输出预处理")
 print("-"*70)
 
-converter = FormulaConverter(config)
+converter = get_formula_converter()
 
 # 模拟LLM返回的错误格式
 test_llm_output = """$
@@ -6,6 +6,17 @@
 """
 
 import re
+import string
+from array import array
+from functools import lru_cache
+
+from _overlap import find_longest_overlap
+
+try:
+    import numpy as np
+    from numpy.lib.stride_tricks import sliding_window_view
+except ImportError:  # 轻量环境下回退到逐字符比较
+    np = None
 
 print("\n" + "="*70)
 print("问题修复验证测试 (独立版本)")
@@ -18,16 +29,35 @@ print("\n" + "-"*70)
 print("测试1: f'(x) 不应变成 f'}(x)")
 print("-"*70)
 
+_ASCII_LETTERS = frozenset(string.ascii_letters)
+_PRIME = "\\\\prime"
+
 def normalize_inline_latex(latex: str) -> str:
     """将形如 f' 或 f'' 等用 prime 表示的记号转换为标准LaTeX"""
-    def repl(match: re.Match) -> str:
-        base = match.group(1)
-        primes = match.group(2)
-        prime_str = "\\\\prime" * len(primes)
-        return f"{base}^{{{prime_str}}}"
-
-    converted = re.sub(r"([A-Za-z])('{1,4})(?![a-zA-Z])", repl, latex)
-    return converted
+    # 单次扫描：只在 ' 出现处检查前一个字母，其余片段按切片原样拷贝
+    parts = []
+    pos = 0
+    n = len(latex)
+    i = latex.find("'")
+    while i != -1:
+        j = i
+        while j < n and latex[j] == "'":
+            j += 1
+        if i > 0 and latex[i - 1] in _ASCII_LETTERS:
+            # 最多4个 prime；恰好用完整串 ' 且后面紧跟字母时少取一个
+            count = min(j - i, 4)
+            if count == j - i and j < n and latex[j] in _ASCII_LETTERS:
+                count -= 1
+            if count:
+                parts.append(latex[pos:i - 1])
+                parts.append(f"{latex[i - 1]}^{{{_PRIME * count}}}")
+                pos = i + count
+        i = latex.find("'", j)
+
+    if not parts:
+        return latex
+    parts.append(latex[pos:])
+    return ''.join(parts)
 
 test_cases_1 = [
     ("f'(x) = 1", "f^{\\\\prime}(x) = 1"),
@@ -58,8 +88,15 @@ print("\n" + "-"*70)
 print("测试2: 修复整段文本被识别为公式")
 print("-"*70)
 
+# 需要修复的多行环境起始标记（与下方正则中的 \\begin{...} 对应）
+_MULTILINE_ENV_BEGINS = ('\\begin{aligned}', '\\begin{gathered}', '\\begin{array}', '\\begin{cases}')
+
 def preprocess_llm_output(content: str) -> str:
     """预处理LLM输出，修复常见的格式问题"""
+    # 多数输出不含多行环境：子串查找即可判定，跳过带后行断言的 DOTALL 正则
+    if '$' not in content or not any(env in content for env in _MULTILINE_ENV_BEGINS):
+        return content
+
     def fix_wrapped_content(match):
         inner = match.group(1)
 
@@ -123,6 +160,80 @@ print("\n" + "-"*70)
 print("测试3: 重叠内容检测和移除")
 print("-"*70)
 
+# 归一化用到的正则（模块加载时编译一次）
+_WS_RE = re.compile(r'[ \\t]+')
+_NL_RE = re.compile(r'\\n{3,}')
+
+@lru_cache(maxsize=256)
+def normalize_for_comparison(text: str) -> str:
+    """归一化文本用于重复检测；流式合并时同一段已合并文本会被反复比较，结果按输入缓存"""
+    text = _WS_RE.sub(' ', text)
+    text = _NL_RE.sub('\\n\\n', text)
+    return text.strip()
+
+def _normalize_with_map(text: str):
+    """
+    归一化文本并返回下标映射（结果与 normalize_for_comparison 相同）
+
+    Returns:
+        (normalized, orig_index): orig_index[i] 为 normalized[i] 在 text 中的位置，
+        被压缩的字符串映射到该串的第一个字符
+    """
+    # _WS_RE 的字符集包含反斜杠，替换后 _NL_RE 不可能再命中，映射只需跟踪 _WS_RE
+    orig_index = array('i')
+    pos = 0
+    for match in _WS_RE.finditer(text):
+        start = match.start()
+        orig_index.extend(range(pos, start))
+        orig_index.append(start)
+        pos = match.end()
+    orig_index.extend(range(pos, len(text)))
+
+    collapsed = _WS_RE.sub(' ', text)
+    normalized = collapsed.lstrip()
+    lead = len(collapsed) - len(normalized)
+    normalized = normalized.rstrip()
+    return normalized, orig_index[lead:lead + len(normalized)]
+
+def _code_points(tail: str, prefix: str):
+    """
+    将两段字符串转换为同一dtype的码点数组，便于整段向量化比较
+
+    两段都是纯ASCII时（LaTeX输出的常见情况）用 uint8，比 uint32 少读写3/4的内存
+    """
+    if tail.isascii() and prefix.isascii():
+        return (np.frombuffer(tail.encode('ascii'), dtype=np.uint8),
+                np.frombuffer(prefix.encode('ascii'), dtype=np.uint8))
+    return (np.frombuffer(tail.encode('utf-32-le', 'surrogatepass'), dtype='<u4'),
+            np.frombuffer(prefix.encode('utf-32-le', 'surrogatepass'), dtype='<u4'))
+
+# 批量模糊比较：可比较长度不足时逐长度比较更划算；每批比较的长度个数
+_FUZZY_BATCH_MIN_LEN = 64
+_FUZZY_BATCH_SIZE = 256
+
+def _longest_fuzzy_overlap(tail_codes, prefix_codes, shortest: int) -> int:
+    """
+    返回不短于 shortest、相似度 > 0.80 的最长重叠长度（没有则返回0）
+
+    tail 末尾补齐 max_len 个填充值后取滑动窗口：第 s 个窗口与 prefix 对齐比较，
+    恰好对应长度 max_len - s 的重叠（超出部分是填充值，不计入匹配），
+    一批长度用一次二维比较完成，命中后不再计算更短的长度。
+    """
+    max_len = len(prefix_codes)
+    # 填充值取dtype最大值：超出ASCII/Unicode码点范围，与任何字符都不相等
+    no_code_point = np.iinfo(tail_codes.dtype).max
+    padded = np.concatenate((tail_codes, np.full(max_len, no_code_point, dtype=tail_codes.dtype)))
+    windows = sliding_window_view(padded, max_len)
+    shift_count = max_len - shortest + 1
+    for start in range(0, shift_count, _FUZZY_BATCH_SIZE):
+        stop = min(start + _FUZZY_BATCH_SIZE, shift_count)
+        lengths = max_len - np.arange(start, stop)
+        matches = np.count_nonzero(windows[start:stop] == prefix_codes, axis=1)
+        hits = np.flatnonzero(matches / lengths > 0.80)
+        if hits.size:
+            return int(lengths[hits[0]])
+    return 0
+
 def trim_overlap_text(existing: str, new_content: str, max_overlap: int = 2000,
                      min_overlap: int = 50) -> str:
     """去除与已合并文本重复的前缀"""
@@ -136,50 +247,64 @@ def trim_overlap_text(existing: str, new_content: str, max_overlap: int = 2000,
     if not existing:
         return candidate
 
-    def normalize_for_comparison(text: str) -> str:
-        text = re.sub(r'[ \\t]+', ' ', text)
-        text = re.sub(r'\\n{3,}', '\\n\\n', text)
-        return text.strip()
-
+    # 结果只取决于已合并文本的尾部窗口：流式合并中同一尾部会被反复比较
     existing_normalized = normalize_for_comparison(existing)
-    candidate_normalized = normalize_for_comparison(candidate)
+    return _trim_against_tail(existing_normalized[-max_overlap:], candidate, min_overlap)
+
+@lru_cache(maxsize=1024)
+def _trim_against_tail(existing_tail: str, candidate: str, min_overlap: int) -> str:
+    """在已归一化的尾部窗口上查找重叠并切除，结果按 (尾部, 候选, min_overlap) 缓存"""
+    candidate_normalized, candidate_index = _normalize_with_map(candidate)
 
-    if candidate_normalized in existing_normalized:
+    # 检查完全重复：切片重叠只发生在尾部窗口内，无需在整篇已合并文本中查找
+    if candidate_normalized in existing_tail:
         return ""
 
-    existing_tail = existing_normalized[-max_overlap:]
     max_len = min(len(existing_tail), len(candidate_normalized))
 
-    best_overlap_len = 0
-    for overlap in range(max_len, min_overlap - 1, -1):
-        suffix = existing_tail[-overlap:]
-        prefix = candidate_normalized[:overlap]
-
-        if suffix == prefix:
+    # 精确匹配：与主流程共用同一重叠查找
+    exact_overlap = find_longest_overlap(existing_tail, candidate_normalized, min_overlap)
+
+    # 模糊匹配只可能在比精确重叠更长的长度上改变结果
+    # （较短的长度即使相似度达标，降序扫描时也会先命中精确重叠）
+    best_overlap_len = exact_overlap
+    fuzzy_floor = max(exact_overlap + 1, min_overlap)
+    # 只对较长的重叠做模糊匹配：不短于 min_overlap * 1.2 的最小整数长度
+    fuzzy_shortest = max(fuzzy_floor, int(min_overlap * 1.2))
+    if fuzzy_shortest < min_overlap * 1.2:
+        fuzzy_shortest += 1
+    tail_codes = prefix_codes = None
+    if np is not None and max_len >= fuzzy_shortest:
+        # 一次性转换为码点数组，逐字符比较由 NumPy 整段完成
+        tail_codes, prefix_codes = _code_points(existing_tail[-max_len:], candidate_normalized[:max_len])
+        if max_len >= _FUZZY_BATCH_MIN_LEN:
+            fuzzy_overlap = _longest_fuzzy_overlap(tail_codes, prefix_codes, fuzzy_shortest)
+            if fuzzy_overlap:
+                best_overlap_len = fuzzy_overlap
+            fuzzy_floor = max_len + 1  # 已批量完成，跳过下面的逐长度循环
+    for overlap in range(max_len, fuzzy_floor - 1, -1):
+        if overlap < min_overlap * 1.2:
+            break
+        if tail_codes is not None:
+            matches = int(np.count_nonzero(tail_codes[max_len - overlap:] == prefix_codes[:overlap]))
+        else:
+            suffix = existing_tail[-overlap:]
+            prefix = candidate_normalized[:overlap]
+            matches = sum(c1 == c2 for c1, c2 in zip(suffix, prefix))
+        similarity = matches / overlap
+        if similarity > 0.80:
             best_overlap_len = overlap
             break
 
-        if overlap >= min_overlap * 1.2:
-            similarity = sum(c1 == c2 for c1, c2 in zip(suffix, prefix)) / overlap
-            if similarity > 0.80:
-                best_overlap_len = overlap
-                break
-
     if best_overlap_len > 0:
-        remaining_normalized = candidate_normalized[best_overlap_len:].lstrip()
-
-        if not remaining_normalized:
+        # 跳过重叠后的空白，再通过归一化时记录的下标映射直接定位原始文本中的切分点
+        cut = best_overlap_len
+        normalized_len = len(candidate_normalized)
+        while cut < normalized_len and candidate_normalized[cut].isspace():
+            cut += 1
+        if cut >= normalized_len:
             return ""
-
-        search_prefix = remaining_normalized[:min(50, len(remaining_normalized))]
-        remaining_start = candidate.find(search_prefix)
-
-        if remaining_start > 0:
-            return candidate[remaining_start:].lstrip()
-        else:
-            ratio = best_overlap_len / len(candidate_normalized) if len(candidate_normalized) > 0 else 0
-            cut_pos = int(len(candidate) * ratio)
-            return candidate[cut_pos:].lstrip()
+        return candidate[candidate_index[cut]:]
 
     return candidate
 
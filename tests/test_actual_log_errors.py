@@ -9,15 +9,10 @@ import os
 
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
 
-from src.formula_converter import FormulaConverter
-import yaml
+from tests._shared import get_formula_converter
 
-# 加载配置
-config_path = os.path.join(os.path.dirname(__file__), '..', 'config', 'config.yaml')
-with open(config_path, 'r', encoding='utf-8') as f:
-    config = yaml.safe_load(f)
-
-formula_converter = FormulaConverter(config)
+# 共享实例（配置只解析一次）
+formula_converter = get_formula_converter()
 
 print("=" * 80)
 print("测试实际日志中发现的OCR错误")
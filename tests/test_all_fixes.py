@@ -6,26 +6,20 @@
 
 import sys
 import os
-import yaml
+import traceback
 
 # 添加src目录到路径
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
 
-from src.formula_converter import FormulaConverter
-from src.document_generator import DocumentGenerator
-
-# 加载配置
-config_path = os.path.join(os.path.dirname(__file__), '..', 'config', 'config.yaml')
-with open(config_path, 'r', encoding='utf-8') as f:
-    config = yaml.safe_load(f)
+from tests._shared import get_document_generator, get_formula_converter
 
 print("=" * 80)
 print("完整测试：验证所有三个问题的修复")
 print("=" * 80)
 
-# 初始化
-formula_converter = FormulaConverter(config)
-document_generator = DocumentGenerator(config)
+# 初始化（共享实例，配置只解析一次）
+formula_converter = get_formula_converter()
+document_generator = get_document_generator()
 
 print("\n初始化成功")
 print(f"  FormulaConverter: OK")
@@ -84,47 +78,44 @@ test2_cases = [
 ]
 
 from latex2mathml.converter import convert as latex_to_mathml
-import xml.etree.ElementTree as ET
-
-for name, latex in test2_cases:
-    print(f"\n{name}:")
-    print(f"  LaTeX: {latex}")
+from lxml import etree as ET
+from functools import lru_cache
 
-    try:
-        mathml = latex_to_mathml(latex)
+# mrow > mo + mtable + mo 结构：首尾子元素为 mo，且含 mtable 子元素。
+# 用 local-name() 匹配，MathML 带不带命名空间都能命中；遍历在 libxml2 中完成。
+# 谓词按代价从低到高排列：首个子元素不是 mo 就立即淘汰，不再数子元素或扫描兄弟
+_MATRIX_MROW_XPATH = ET.XPath(
+    "descendant-or-self::*[local-name()='mrow']"
+    "[*[1][local-name()='mo']][*[last()][local-name()='mo']]"
+    "[count(*) >= 3][*[local-name()='mtable']]"
+)
 
-        # 解析MathML，检查结构
-        root = ET.fromstring(mathml)
 
-        # 查找mrow > mo + mtable + mo 结构
-        def check_matrix_structure(elem, depth=0):
-            tag = elem.tag.split('}')[-1] if '}' in elem.tag else elem.tag
+# 查找mrow > mo + mtable + mo 结构（文档顺序的第一个）
+def check_matrix_structure(elem):
+    matches = _MATRIX_MROW_XPATH(elem)
+    if not matches:
+        return False, '', ''
 
-            if tag == 'mrow':
-                children = list(elem)
-                if len(children) >= 3:
-                    first_tag = children[0].tag.split('}')[-1] if '}' in children[0].tag else children[0].tag
-                    last_tag = children[-1].tag.split('}')[-1] if '}' in children[-1].tag else children[-1].tag
+    mrow = matches[0]
+    open_bracket = mrow[0].text or ''
+    close_bracket = mrow[-1].text or ''
+    return True, open_bracket, close_bracket
 
-                    # 检查是否有mtable
-                    has_mtable = any(
-                        (child.tag.split('}')[-1] if '}' in child.tag else child.tag) == 'mtable'
-                        for child in children
-                    )
 
-                    if first_tag == 'mo' and last_tag == 'mo' and has_mtable:
-                        open_bracket = children[0].text or ''
-                        close_bracket = children[-1].text or ''
-                        return True, open_bracket, close_bracket
+@lru_cache(maxsize=32)
+def _check_matrix(latex):
+    """LaTeX -> MathML -> 矩阵结构检查，同一公式只转换和解析一次"""
+    mathml = latex_to_mathml(latex)
+    return check_matrix_structure(ET.fromstring(mathml))
 
-            for child in elem:
-                result = check_matrix_structure(child, depth + 1)
-                if result[0]:
-                    return result
 
-            return False, '', ''
+for name, latex in test2_cases:
+    print(f"\n{name}:")
+    print(f"  LaTeX: {latex}")
 
-        found, open_br, close_br = check_matrix_structure(root)
+    try:
+        found, open_br, close_br = _check_matrix(latex)
         if found:
             print(f"  MathML结构: ✅ 找到矩阵结构")
             print(f"  括号: '{open_br}' ... '{close_br}'")
@@ -163,7 +154,6 @@ try:
     print(f"  ✅ 文档已生成: {saved_path} ({file_size/1024:.1f} KB)")
 except Exception as e:
     print(f"  ❌ 文档生成失败: {e}")
-    import traceback
     traceback.print_exc()
 
 # ============================================================================
@@ -221,7 +211,6 @@ try:
     print(f"  ✅ 文档已生成: {saved_path3} ({file_size3/1024:.1f} KB)")
 except Exception as e:
     print(f"  ❌ 文档生成失败: {e}")
-    import traceback
     traceback.print_exc()
 
 # ============================================================================
@@ -6,22 +6,19 @@
 
 import sys
 import os
-import yaml
 from zipfile import ZipFile
 from lxml import etree
 
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
 
-from src.formula_converter import FormulaConverter
-from src.document_generator import DocumentGenerator
+from tests._shared import get_document_generator, get_formula_converter
 
-# 加载配置
-config_path = os.path.join(os.path.dirname(__file__), '..', 'config', 'config.yaml')
-with open(config_path, 'r', encoding='utf-8') as f:
-    config = yaml.safe_load(f)
+# 复用同一个解析器，不为每次解析重新创建；不需要按 ID 查找元素
+_XML_PARSER = etree.XMLParser(huge_tree=False, collect_ids=False)
 
-formula_converter = FormulaConverter(config)
-document_generator = DocumentGenerator(config)
+# 共享实例（配置只解析一次）
+formula_converter = get_formula_converter()
+document_generator = get_document_generator()
 
 print("=" * 80)
 print("深度检查：验证Word文档中的OMML结构")
@@ -44,12 +41,9 @@ doc = document_generator.create_document(formatted_elements)
 doc_path = 'output/test_matrix_omml.docx'
 document_generator.save_document(doc, 'test_matrix_omml.docx')
 
-# 解压docx并检查document.xml
-with ZipFile(doc_path, 'r') as zip_ref:
-    document_xml = zip_ref.read('word/document.xml')
-
-# 解析XML
-root = etree.fromstring(document_xml)
+# 解压docx并检查document.xml：直接从zip流解析，不先读出整段bytes
+with ZipFile(doc_path, 'r') as zip_ref, zip_ref.open('word/document.xml') as document_xml:
+    root = etree.parse(document_xml, _XML_PARSER).getroot()
 
 # 查找所有oMath元素
 MATH_NS = 'http://schemas.openxmlformats.org/officeDocument/2006/math'
@@ -136,6 +136,26 @@ class TestFormulaConverter:
         assert len(formulas) == 1
         assert formulas[0][0] == 'display'
 
+    def test_post_process_keeps_pinyin_in_text(self, formula_converter):
+        """测试正文中的拼音长音符不被改写"""
+        text = "拼音：nǚ shū māma；日本 Tōkyō；dì-yī"
+        assert formula_converter.post_process_llm_output(text) == text
+
+    def test_post_process_combining_overline_in_math(self, formula_converter):
+        """测试公式中的组合上划线（Y + U+0304）转为 \\bar{Y}"""
+        result = formula_converter.post_process_llm_output("均值 $Y\u0304 = 1$")
+        assert result == r"均值 $\bar{Y} = 1$"
+
+    def test_post_process_precomposed_macron_in_math(self, formula_converter):
+        """测试公式中的预组合字母 Ȳ 转为 \\bar{Y}，正文中的 Ȳ 保持不变"""
+        result = formula_converter.post_process_llm_output("$$Ȳ = \\frac{1}{N}$$ 其中 Ȳ 是平均值")
+        assert result == r"$$\bar{Y} = \frac{1}{N}$$ 其中 Ȳ 是平均值"
+
+    def test_fix_ocr_bar_keeps_existing_bar(self, formula_converter):
+        """测试OCR的 ar{ 修复不会改写已正确的 \\bar{（回归：曾输出 \\b\\bar{）"""
+        assert formula_converter.fix_common_latex_patterns(r"$\bar{x}$") == r"$\bar{x}$"
+        assert formula_converter.fix_common_latex_patterns("ar{x}1") == r"\bar{x}_1"
+
 
 if __name__ == '__main__':
     pytest.main([__file__, '-v'])
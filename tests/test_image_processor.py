@@ -34,9 +34,9 @@ def image_processor(config):
     return ImageProcessor(config)
 
 
-@pytest.fixture
+@pytest.fixture(scope="module")
 def sample_image():
-    """创建测试图像"""
+    """创建测试图像（模块内共享，各测试只读不修改）"""
     img = Image.new('RGB', (800, 600), color='white')
     return img
 
@@ -8,31 +8,115 @@ import os
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 from src.main import AdvancedOCR
+import hashlib
+import json
 import re
+from functools import lru_cache
+
+# OCR 结果磁盘缓存（需设置环境变量 OCR_TEST_CACHE=1 才启用）：
+# 缓存会重放旧结果，后处理代码改动后无法发现回归，默认每次都重新识别。
+# 结果结构变化时递增版本号使旧缓存失效
+_OCR_CACHE_ENABLED = os.environ.get('OCR_TEST_CACHE', '').lower() in {'1', 'true', 'yes'}
+_OCR_CACHE_DIR = os.path.join(os.path.dirname(__file__), '.ocr_cache')
+_OCR_CACHE_VERSION = 1
+
+# 测试图片目录只枚举一次，各测试用集合查询代替逐个 os.path.exists
+_SAMPLE_IMAGES_DIR = "tests/sample_images"
+try:
+    with os.scandir(_SAMPLE_IMAGES_DIR) as _entries:
+        _AVAILABLE = frozenset(entry.name for entry in _entries)
+except OSError:
+    _AVAILABLE = frozenset()
+
+# 预期的LaTeX模式
+_SUMMATION_PATTERNS = (
+    r'\\sum_\{[^}]+\}\^?\{[^}]*\}',  # \sum_{i=1}^{N}
+    r'\\sum_\{[^}]+\}',               # \sum_{i=1}
+    r'\\sum\^?\{[^}]*\}',             # \sum^{N}
+)
+_MEAN_PATTERNS = (
+    r'\\bar\{[^}]+\}',       # \bar{Y}
+    r'\\overline\{[^}]+\}',  # \overline{Y}
+)
+
+
+def _compile_any(patterns):
+    """把多个模式合并成一个带命名分组的交替式，一次扫描即可判断是否命中"""
+    return re.compile('|'.join(f'(?P<p{i}>{p})' for i, p in enumerate(patterns)))
+
+
+def _matched_pattern(rx_any, patterns, content):
+    """返回命中的子模式（由 match.lastgroup 确定），未命中返回 None"""
+    match = rx_any.search(content)
+    if match is None:
+        return None
+    return patterns[int(match.lastgroup[1:])]
+
+
+_SUMMATION_ANY = _compile_any(_SUMMATION_PATTERNS)
+_MEAN_ANY = _compile_any(_MEAN_PATTERNS)
+_FRACTION_RE = re.compile(r'\\frac\{[^}]+\}\{[^}]+\}')
+
+
+@lru_cache(maxsize=1)
+def _get_ocr():
+    """共享的 AdvancedOCR 实例，首次使用时创建，避免每个测试重复加载配置和客户端"""
+    return AdvancedOCR()
+
+
+@lru_cache(maxsize=1)
+def _config_digest():
+    """当前 OCR 配置的摘要，配置改动后缓存自动失效"""
+    config_json = json.dumps(_get_ocr().config, sort_keys=True, default=str)
+    return hashlib.sha256(config_json.encode('utf-8')).hexdigest()
+
+
+def cached_process(image_path):
+    """按图像内容哈希缓存 process_image 的结果，重复运行时跳过 OCR（仅在启用缓存时）"""
+    if not _OCR_CACHE_ENABLED:
+        return _get_ocr().process_image(image_path)
+
+    with open(image_path, 'rb') as f:
+        image_digest = hashlib.sha256(f.read()).hexdigest()
+    key = hashlib.sha256(
+        f"{_OCR_CACHE_VERSION}:{_config_digest()}:{image_digest}".encode('utf-8')
+    ).hexdigest()
+    cache_path = os.path.join(_OCR_CACHE_DIR, f"{key}.json")
+
+    try:
+        with open(cache_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        pass
+
+    result = _get_ocr().process_image(image_path)
+
+    # 只缓存成功的结果，失败时下次重新识别
+    if result.get('success'):
+        try:
+            os.makedirs(_OCR_CACHE_DIR, exist_ok=True)
+            with open(cache_path, 'w', encoding='utf-8') as f:
+                json.dump(result, f, ensure_ascii=False, default=str)
+        except OSError as e:
+            print(f"警告: 写入OCR缓存失败 - {e}")
+
+    return result
 
 
 def test_summation_recognition():
     """测试求和符号识别"""
-    # 预期的LaTeX模式
-    summation_patterns = [
-        r'\\sum_\{[^}]+\}\^?\{[^}]*\}',  # \sum_{i=1}^{N}
-        r'\\sum_\{[^}]+\}',               # \sum_{i=1}
-        r'\\sum\^?\{[^}]*\}',             # \sum^{N}
-    ]
-
     print("=" * 80)
     print("测试求和符号识别")
     print("=" * 80)
 
     # 这里需要一个包含求和符号的测试图片
-    test_image = "tests/sample_images/summation_test.png"
+    test_image = os.path.join(_SAMPLE_IMAGES_DIR, "summation_test.png")
 
-    if not os.path.exists(test_image):
+    if "summation_test.png" not in _AVAILABLE:
         print(f"警告: 测试图片 {test_image} 不存在，跳过测试")
         return False
 
-    ocr = AdvancedOCR()
-    result = ocr.process_image(test_image)
+    result = cached_process(test_image)
 
     if not result['success']:
         print(f"错误: OCR处理失败 - {result['error']}")
@@ -41,12 +125,10 @@ def test_summation_recognition():
     content = result.get('content', '')
 
     # 检查是否包含求和符号
-    found_summation = False
-    for pattern in summation_patterns:
-        if re.search(pattern, content):
-            print(f"✓ 找到求和符号: {pattern}")
-            found_summation = True
-            break
+    pattern = _matched_pattern(_SUMMATION_ANY, _SUMMATION_PATTERNS, content)
+    found_summation = pattern is not None
+    if found_summation:
+        print(f"✓ 找到求和符号: {pattern}")
 
     if not found_summation:
         print("✗ 未找到正确的求和符号格式")
@@ -58,24 +140,17 @@ def test_summation_recognition():
 
 def test_mean_symbol_recognition():
     """测试平均值符号识别"""
-    # 预期的LaTeX模式
-    mean_patterns = [
-        r'\\bar\{[^}]+\}',       # \bar{Y}
-        r'\\overline\{[^}]+\}',  # \overline{Y}
-    ]
-
     print("=" * 80)
     print("测试平均值符号识别")
     print("=" * 80)
 
-    test_image = "tests/sample_images/mean_test.png"
+    test_image = os.path.join(_SAMPLE_IMAGES_DIR, "mean_test.png")
 
-    if not os.path.exists(test_image):
+    if "mean_test.png" not in _AVAILABLE:
         print(f"警告: 测试图片 {test_image} 不存在，跳过测试")
         return False
 
-    ocr = AdvancedOCR()
-    result = ocr.process_image(test_image)
+    result = cached_process(test_image)
 
     if not result['success']:
         print(f"错误: OCR处理失败 - {result['error']}")
@@ -84,12 +159,10 @@ def test_mean_symbol_recognition():
     content = result.get('content', '')
 
     # 检查是否包含平均值符号
-    found_mean = False
-    for pattern in mean_patterns:
-        if re.search(pattern, content):
-            print(f"✓ 找到平均值符号: {pattern}")
-            found_mean = True
-            break
+    pattern = _matched_pattern(_MEAN_ANY, _MEAN_PATTERNS, content)
+    found_mean = pattern is not None
+    if found_mean:
+        print(f"✓ 找到平均值符号: {pattern}")
 
     if not found_mean:
         print("✗ 未找到正确的平均值符号格式")
@@ -101,21 +174,17 @@ def test_mean_symbol_recognition():
 
 def test_fraction_recognition():
     """测试分数识别"""
-    # 预期的LaTeX模式
-    fraction_pattern = r'\\frac\{[^}]+\}\{[^}]+\}'
-
     print("=" * 80)
     print("测试分数识别")
     print("=" * 80)
 
-    test_image = "tests/sample_images/fraction_test.png"
+    test_image = os.path.join(_SAMPLE_IMAGES_DIR, "fraction_test.png")
 
-    if not os.path.exists(test_image):
+    if "fraction_test.png" not in _AVAILABLE:
         print(f"警告: 测试图片 {test_image} 不存在，跳过测试")
         return False
 
-    ocr = AdvancedOCR()
-    result = ocr.process_image(test_image)
+    result = cached_process(test_image)
 
     if not result['success']:
         print(f"错误: OCR处理失败 - {result['error']}")
@@ -124,7 +193,7 @@ def test_fraction_recognition():
     content = result.get('content', '')
 
     # 检查是否包含分数
-    if re.search(fraction_pattern, content):
+    if _FRACTION_RE.search(content):
         print(f"✓ 找到分数格式: \\frac{{}}{{}} ")
         return True
     else:
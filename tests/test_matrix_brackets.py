@@ -1,8 +1,14 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
-from latex2mathml.converter import convert as latex_to_mathml
-import xml.etree.ElementTree as ET
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from tests._mathml_util import cached_latex_to_mathml
+from tests._shared import preview
+from lxml import etree
 
 # Test different matrix environments
 matrices = {
@@ -12,6 +18,7 @@ matrices = {
     'Vmatrix': r'\begin{Vmatrix} 1 & 2 \\ 3 & 4 \end{Vmatrix}',
 }
 
+
 print("=" * 80)
 print("Matrix bracket conversion test")
 print("=" * 80)
@@ -22,23 +29,15 @@ for matrix_type, latex in matrices.items():
     print("LaTeX: " + latex)
 
     try:
-        mathml = latex_to_mathml(latex)
-        print("MathML (first 200 chars): " + mathml[:200] + "...")
-
-        # Parse MathML and find mfenced elements
-        root = ET.fromstring(mathml)
-
-        # Recursively find all mfenced elements
-        def find_mfenced(elem, depth=0):
-            tag = elem.tag.split('}')[-1] if '}' in elem.tag else elem.tag
-            if tag == 'mfenced':
-                open_attr = elem.get('open', '(')
-                close_attr = elem.get('close', ')')
-                print("  Found mfenced: open='" + open_attr + "', close='" + close_attr + "'")
-            for child in elem:
-                find_mfenced(child, depth + 1)
-
-        find_mfenced(root)
+        mathml = cached_latex_to_mathml(latex)
+        print("MathML (first 200 chars): " + preview(mathml, 200))
+
+        # Parse MathML and find mfenced elements ({*} matches with or without namespace)
+        root = etree.fromstring(mathml.encode())
+        for elem in root.iter('{*}mfenced'):
+            open_attr = elem.get('open', '(')
+            close_attr = elem.get('close', ')')
+            print("  Found mfenced: open='" + open_attr + "', close='" + close_attr + "'")
 
     except Exception as e:
         print("  Conversion failed: " + str(e))
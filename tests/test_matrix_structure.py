@@ -1,9 +1,13 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
-from latex2mathml.converter import convert as latex_to_mathml
-import xml.etree.ElementTree as ET
-import xml.dom.minidom as minidom
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from tests._mathml_util import cached_latex_to_mathml
+from lxml import etree
 
 # Test bmatrix (should have square brackets)
 latex = r'\begin{bmatrix} 1 & 2 \\ 3 & 4 \end{bmatrix}'
@@ -14,11 +18,11 @@ print("=" * 80)
 print("LaTeX:", latex)
 print()
 
-mathml = latex_to_mathml(latex)
+mathml = cached_latex_to_mathml(latex)
 
-# Pretty print the MathML
-dom = minidom.parseString(mathml)
-pretty_mathml = dom.toprettyxml(indent="  ")
+# Pretty print the MathML (lxml formats in C, no extra DOM)
+root = etree.fromstring(mathml.encode())
+pretty_mathml = etree.tostring(root, pretty_print=True, encoding='unicode')
 print("MathML:")
 print(pretty_mathml)
 
@@ -6,20 +6,14 @@
 
 import sys
 import os
-import yaml
 
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
 
-from src.formula_converter import FormulaConverter
-from src.document_generator import DocumentGenerator
+from tests._shared import get_document_generator, get_formula_converter, preview
 
-# 加载配置
-config_path = os.path.join(os.path.dirname(__file__), '..', 'config', 'config.yaml')
-with open(config_path, 'r', encoding='utf-8') as f:
-    config = yaml.safe_load(f)
-
-formula_converter = FormulaConverter(config)
-document_generator = DocumentGenerator(config)
+# 共享实例（配置由 libyaml 的 C 加载器只解析一次）
+formula_converter = get_formula_converter()
+document_generator = get_document_generator()
 
 print("=" * 80)
 print("实际场景测试：模拟真实的OCR错误输入")
@@ -39,7 +33,7 @@ $$\begin{equation}= \frac{4 - 20y_0 2 + 8y_0 2 + 4x_0 + 2 + 2y_0 2}{2 + 2y_0 2}
 
 print("\n步骤1: 原始输入（含OCR错误）")
 print("-" * 80)
-print(user_provided_error[:300] + "...")
+print(preview(user_provided_error, 300))
 
 # 逐步测试每个修复函数
 print("\n步骤2: 应用Unicode修复")
@@ -49,15 +43,17 @@ if after_unicode == user_provided_error:
     print("⚠️  没有变化（可能没有Unicode符号）")
 else:
     print("✅ 有变化")
-    # 显示差异
-    import difflib
-    diff = difflib.unified_diff(
-        user_provided_error[:200].split('\n'),
-        after_unicode[:200].split('\n'),
-        lineterm=''
-    )
-    for line in list(diff)[:10]:
-        print(line)
+    # 显示差异（仅诊断用，设置 VERBOSE 环境变量时才计算）
+    if os.environ.get("VERBOSE"):
+        import difflib
+        from itertools import islice
+        diff = difflib.unified_diff(
+            user_provided_error[:200].splitlines(),
+            after_unicode[:200].splitlines(),
+            lineterm=''
+        )
+        for line in islice(diff, 10):
+            print(line)
 
 print("\n步骤3: 应用LaTeX格式修复")
 print("-" * 80)
@@ -97,7 +93,7 @@ for original, expected, _ in key_fixes:
 
 print("\n步骤5: 显示修复后的内容")
 print("-" * 80)
-print(fully_processed[:400] + "...")
+print(preview(fully_processed, 400))
 
 print("\n步骤6: 生成Word文档")
 print("-" * 80)
@@ -9,12 +9,17 @@
 
 import sys
 import os
+import re
+import traceback
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from src.formula_converter import FormulaConverter
-from src.document_generator import DocumentGenerator
+from tests._shared import get_document_generator, get_formula_converter, preview
 from docx import Document
-import yaml
+
+# MathML结构检查：一次扫描收集出现过的标签名，代替对同一字符串的多次 in 查找。
+# 各备选之间不会互相重叠，收集结果与逐个子串查找一致
+_SCRIPT_TAG_RE = re.compile(r'msub(?:sup)?|msup')
+_MATRIX_TAG_RE = re.compile(r'mtable|mfenced|mo')
 
 
 def test_subscript_superscript():
@@ -23,11 +28,8 @@ def test_subscript_superscript():
     print("问题1: 测试同时有下标和上标")
     print("=" * 80)
 
-    # 加载配置
-    with open('config/config.yaml', 'r', encoding='utf-8') as f:
-        config = yaml.safe_load(f)
-
-    converter = FormulaConverter(config)
+    # 共享实例（配置只解析一次）
+    converter = get_formula_converter()
 
     # 测试用例: 同时有下标和上标
     test_cases = [
@@ -44,12 +46,13 @@ def test_subscript_superscript():
         # 转换为MathML
         mathml = converter.convert_latex_to_mathml(latex)
         print(f"MathML长度: {len(mathml)} 字符")
-        print(f"MathML预览: {mathml[:200]}...")
+        print(f"MathML预览: {preview(mathml, 200)}")
 
         # 检查MathML是否包含正确的标签
-        if "msubsup" in mathml:
+        script_tags = set(_SCRIPT_TAG_RE.findall(mathml))
+        if "msubsup" in script_tags:
             print("✓ MathML使用了msubsup（同时下标上标）")
-        elif "msub" in mathml and "msup" in mathml:
+        elif "msub" in script_tags and "msup" in script_tags:
             print("✗ MathML分别使用了msub和msup（可能导致平铺）")
         else:
             print("? MathML结构未知")
@@ -63,11 +66,8 @@ def test_vector_symbols():
     print("问题2: 测试向量符号")
     print("=" * 80)
 
-    # 加载配置
-    with open('config/config.yaml', 'r', encoding='utf-8') as f:
-        config = yaml.safe_load(f)
-
-    converter = FormulaConverter(config)
+    # 共享实例（配置只解析一次）
+    converter = get_formula_converter()
 
     # 测试用例: 向量符号
     test_cases = [
@@ -84,7 +84,7 @@ def test_vector_symbols():
         # 转换为MathML
         mathml = converter.convert_latex_to_mathml(latex)
         print(f"MathML长度: {len(mathml)} 字符")
-        print(f"MathML预览: {mathml[:300]}...")
+        print(f"MathML预览: {preview(mathml, 300)}")
 
         # 检查MathML是否包含正确的标签
         if "mover" in mathml:
@@ -101,11 +101,8 @@ def test_matrix_symbols():
     print("问题3: 测试矩阵符号")
     print("=" * 80)
 
-    # 加载配置
-    with open('config/config.yaml', 'r', encoding='utf-8') as f:
-        config = yaml.safe_load(f)
-
-    converter = FormulaConverter(config)
+    # 共享实例（配置只解析一次）
+    converter = get_formula_converter()
 
     # 测试用例: 矩阵
     test_cases = [
@@ -122,12 +119,13 @@ def test_matrix_symbols():
             # 转换为MathML
             mathml = converter.convert_latex_to_mathml(latex)
             print(f"MathML长度: {len(mathml)} 字符")
-            print(f"MathML预览: {mathml[:500]}...")
+            print(f"MathML预览: {preview(mathml, 500)}")
 
             # 检查MathML是否包含正确的标签
-            if "mtable" in mathml:
+            matrix_tags = set(_MATRIX_TAG_RE.findall(mathml))
+            if "mtable" in matrix_tags:
                 print("✓ MathML使用了mtable（表格/矩阵）")
-            if "mfenced" in mathml or "mo" in mathml:
+            if "mfenced" in matrix_tags or "mo" in matrix_tags:
                 print("✓ MathML包含括号符号")
             else:
                 print("? MathML结构未知")
@@ -143,19 +141,16 @@ def test_omml_conversion():
     print("测试OMML转换（检查document_generator.py的转换逻辑）")
     print("=" * 80)
 
-    # 加载配置
-    with open('config/config.yaml', 'r', encoding='utf-8') as f:
-        config = yaml.safe_load(f)
-
-    converter = FormulaConverter(config)
-    doc_gen = DocumentGenerator(config)
+    # 共享实例（配置只解析一次）
+    converter = get_formula_converter()
+    doc_gen = get_document_generator()
 
     # 测试同时有下标和上标
     latex = "x_i^2"
     print(f"\n测试LaTeX: {latex}")
 
     mathml = converter.convert_latex_to_mathml(latex)
-    print(f"MathML: {mathml[:200]}...")
+    print(f"MathML: {preview(mathml, 200)}")
 
     # 测试OMML转换
     omml = doc_gen._convert_mathml_to_omml(mathml)
@@ -195,7 +190,6 @@ def main():
             print()
         except Exception as e:
             print(f"测试 {test_name} 出现异常: {str(e)}")
-            import traceback
             traceback.print_exc()
             print()
 
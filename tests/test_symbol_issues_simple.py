@@ -4,7 +4,19 @@
 直接测试latex2mathml转换
 """
 
-from latex2mathml.converter import convert as latex_to_mathml
+import os
+import re
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from tests._mathml_util import cached_latex_to_mathml
+from tests._shared import preview
+
+# MathML结构检查：一次扫描收集出现过的标签名，代替对同一字符串的多次 in 查找。
+# 各备选之间不会互相重叠，收集结果与逐个子串查找一致
+_SCRIPT_TAG_RE = re.compile(r'msub(?:sup)?|msup')
+_MATRIX_TAG_RE = re.compile(r'mtable|mfenced|mo')
 
 
 def test_subscript_superscript():
@@ -27,14 +39,15 @@ def test_subscript_superscript():
 
         # 转换为MathML
         try:
-            mathml = latex_to_mathml(latex)
+            mathml = cached_latex_to_mathml(latex)
             print("MathML长度: {} 字符".format(len(mathml)))
-            print("MathML预览: {}...".format(mathml[:200]))
+            print("MathML预览: {}".format(preview(mathml, 200)))
 
             # 检查MathML是否包含正确的标签
-            if "msubsup" in mathml:
+            script_tags = set(_SCRIPT_TAG_RE.findall(mathml))
+            if "msubsup" in script_tags:
                 print("✓ MathML使用了msubsup（同时下标上标）")
-            elif "msub" in mathml and "msup" in mathml:
+            elif "msub" in script_tags and "msup" in script_tags:
                 print("✗ MathML分别使用了msub和msup（可能导致平铺）")
             else:
                 print("? MathML结构未知")
@@ -64,9 +77,9 @@ def test_vector_symbols():
 
         try:
             # 转换为MathML
-            mathml = latex_to_mathml(latex)
+            mathml = cached_latex_to_mathml(latex)
             print("MathML长度: {} 字符".format(len(mathml)))
-            print("MathML预览: {}...".format(mathml[:300]))
+            print("MathML预览: {}".format(preview(mathml, 300)))
 
             # 检查MathML是否包含正确的标签
             if "mover" in mathml:
@@ -98,14 +111,15 @@ def test_matrix_symbols():
 
         try:
             # 转换为MathML
-            mathml = latex_to_mathml(latex)
+            mathml = cached_latex_to_mathml(latex)
             print("MathML长度: {} 字符".format(len(mathml)))
-            print("MathML预览: {}...".format(mathml[:500]))
+            print("MathML预览: {}".format(preview(mathml, 500)))
 
             # 检查MathML是否包含正确的标签
-            if "mtable" in mathml:
+            matrix_tags = set(_MATRIX_TAG_RE.findall(mathml))
+            if "mtable" in matrix_tags:
                 print("✓ MathML使用了mtable（表格/矩阵）")
-            if "mfenced" in mathml or ("mo" in mathml and ("[" in mathml or "(" in mathml)):
+            if "mfenced" in matrix_tags or ("mo" in matrix_tags and ("[" in mathml or "(" in mathml)):
                 print("✓ MathML包含括号符号")
             else:
                 print("? MathML结构未知")
@@ -7,17 +7,35 @@
 
 import sys
 import os
+import shutil
 import yaml
+
+# 加载配置（优先使用 libyaml 的 C 加载器）
+_YAML_LOADER = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+config_path = os.path.join(os.path.dirname(__file__), '..', 'config', 'config.yaml')
+with open(config_path, 'r', encoding='utf-8') as f:
+    config = yaml.load(f, Loader=_YAML_LOADER)
+
+# 没有LaTeX时TikZ无法渲染，在导入转换器、生成文档之前直接跳过
+latex_command = config.get('graphics', {}).get('tikz', {}).get('latex_command', 'pdflatex')
+if shutil.which(latex_command) is None:
+    skip_reason = f"未找到 {latex_command}，跳过TikZ集成测试"
+    if 'pytest' in sys.modules:
+        import pytest
+        pytest.skip(skip_reason, allow_module_level=True)
+    print(f"SKIP: {skip_reason}")
+    sys.exit(0)
+
+# 测试中启用TikZ渲染缓存，重复运行时跳过已编译过的图形
+config.setdefault('graphics', {}).setdefault('tikz', {})['cache_dir'] = os.path.join(
+    os.path.dirname(__file__), '.tikz_cache'
+)
+
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
 
 from formula_converter import FormulaConverter
 from document_generator import DocumentGenerator
 
-# 加载配置
-config_path = os.path.join(os.path.dirname(__file__), '..', 'config', 'config.yaml')
-with open(config_path, 'r', encoding='utf-8') as f:
-    config = yaml.safe_load(f)
-
 print("=" * 80)
 print("端到端测试：TikZ渲染集成")
 print("=" * 80)
@@ -84,24 +102,30 @@ document_generator = DocumentGenerator(config)
 print(f"   FormulaConverter: OK")
 print(f"   DocumentGenerator: OK (TikZ enabled: {document_generator.tikz_renderer.enabled})")
 
-# 解析内容
-print("\n3. 解析内容（提取公式和文本）...")
-elements = formula_converter.parse_content(llm_output)
-print(f"   解析完成: {len(elements)} 个元素")
+# 解析并格式化内容（单趟流水线，不保留中间元素列表）
+print("\n3. 解析并格式化内容（提取公式和文本）...")
+formatted_elements = list(formula_converter.parse_and_format_for_word(llm_output))
+print(f"   格式化完成: {len(formatted_elements)} 个元素")
 
-for i, elem in enumerate(elements, 1):
+for i, elem in enumerate(formatted_elements, 1):
     elem_type = elem['type']
-    if elem_type == 'text':
+    if elem_type == 'paragraph':
         content_preview = elem['content'][:50].replace('\n', ' ')
         print(f"   元素 {i}: 文本 - {content_preview}...")
     elif elem_type == 'formula':
         latex_preview = elem['latex'][:50]
         print(f"   元素 {i}: 公式 - {latex_preview}...")
 
-# 格式化元素
-print("\n4. 格式化元素...")
-formatted_elements = formula_converter.format_for_word(elements)
-print(f"   格式化完成: {len(formatted_elements)} 个元素")
+# 批量渲染TikZ：所有图形一次LaTeX编译，结果写入磁盘缓存，生成文档时直接命中
+# （预热依赖磁盘缓存，缓存禁用时跳过，避免批量编译后又逐个编译一遍）
+print("\n4. 批量渲染TikZ图形...")
+tikz_codes = [block['code'] for block in document_generator.tikz_renderer.extract_tikz_blocks(llm_output)]
+if tikz_codes and document_generator.tikz_renderer.cache_dir is not None:
+    images = document_generator.tikz_renderer.render_tikz_batch(tikz_codes)
+    rendered_count = sum(1 for image in images if image is not None)
+    print(f"   渲染完成: {rendered_count}/{len(tikz_codes)} 个图形")
+else:
+    print("   跳过（TikZ渲染器未启用、缓存未启用或没有TikZ代码）")
 
 # 生成文档
 print("\n5. 生成Word文档...")
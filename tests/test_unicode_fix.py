@@ -3,12 +3,21 @@
 验证 formula_converter 的 Unicode 符号修复
 """
 
+import re
 import sys
 import os
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 from src.formula_converter import FormulaConverter
 
+# 转换器不持有测试间状态，整个文件共用一个实例
+_CONVERTER = FormulaConverter({})
+
+
+def _expect(*pieces):
+    """按顺序出现的字面片段（如 \\alpha ... \\beta）编译为正则，片段本身转义后按字面匹配"""
+    return re.compile('.*'.join(map(re.escape, pieces)))
+
 
 def test_unicode_to_latex():
     """测试Unicode符号转LaTeX命令"""
@@ -16,30 +25,29 @@ def test_unicode_to_latex():
     print("测试 Unicode → LaTeX 转换")
     print("=" * 80)
 
-    config = {}
-    converter = FormulaConverter(config)
+    converter = _CONVERTER
 
     # 测试用例
     test_cases = [
-        # (输入, 期望输出中应包含的内容, 描述)
-        ("求和符号：Σ", r"\sum", "求和符号 Σ"),
-        ("求和符号：∑", r"\sum", "求和符号 ∑ (小写)"),
-        ("乘积：∏", r"\prod", "乘积符号"),
-        ("积分：∫", r"\int", "积分符号"),
-        ("根号：√2", r"\sqrt", "根号"),
-        ("无穷：∞", r"\infty", "无穷大"),
-        ("约等于：x ≈ 3.14", r"\approx", "约等于"),
-        ("不等于：a ≠ b", r"\neq", "不等于"),
-        ("小于等于：x ≤ 10", r"\leq", "小于等于"),
-        ("大于等于：y ≥ 0", r"\geq", "大于等于"),
-        ("希腊字母：α, β, γ, δ", r"\alpha.*\beta.*\gamma.*\delta", "希腊字母"),
-        ("更多希腊字母：θ, λ, μ, π, σ", r"\theta.*\lambda.*\mu.*\pi.*\sigma", "希腊字母2"),
-        ("乘除：2×3÷4", r"\times.*\div", "乘除号"),
-        ("正负：±1", r"\pm", "正负号"),
-        ("箭头：a→b", r"\rightarrow", "右箭头"),
-        ("双箭头：a⇔b", r"\Leftrightarrow", "双向箭头"),
-        ("集合符号：x∈S, A⊂B, C∪D", r"\in.*\subset.*\cup", "集合符号"),
-        ("逻辑符号：∀x∃y", r"\forall.*\exists", "逻辑符号"),
+        # (输入, 期望输出中应匹配的正则（字面片段预编译）, 描述)
+        ("求和符号：Σ", _expect(r"\sum"), "求和符号 Σ"),
+        ("求和符号：∑", _expect(r"\sum"), "求和符号 ∑ (小写)"),
+        ("乘积：∏", _expect(r"\prod"), "乘积符号"),
+        ("积分：∫", _expect(r"\int"), "积分符号"),
+        ("根号：√2", _expect(r"\sqrt"), "根号"),
+        ("无穷：∞", _expect(r"\infty"), "无穷大"),
+        ("约等于：x ≈ 3.14", _expect(r"\approx"), "约等于"),
+        ("不等于：a ≠ b", _expect(r"\neq"), "不等于"),
+        ("小于等于：x ≤ 10", _expect(r"\leq"), "小于等于"),
+        ("大于等于：y ≥ 0", _expect(r"\geq"), "大于等于"),
+        ("希腊字母：α, β, γ, δ", _expect(r"\alpha", r"\beta", r"\gamma", r"\delta"), "希腊字母"),
+        ("更多希腊字母：θ, λ, μ, π, σ", _expect(r"\theta", r"\lambda", r"\mu", r"\pi", r"\sigma"), "希腊字母2"),
+        ("乘除：2×3÷4", _expect(r"\times", r"\div"), "乘除号"),
+        ("正负：±1", _expect(r"\pm"), "正负号"),
+        ("箭头：a→b", _expect(r"\rightarrow"), "右箭头"),
+        ("双箭头：a⇔b", _expect(r"\Leftrightarrow"), "双向箭头"),
+        ("集合符号：x∈S, A⊂B, C∪D", _expect(r"\in", r"\subset", r"\cup"), "集合符号"),
+        ("逻辑符号：∀x∃y", _expect(r"\forall", r"\exists"), "逻辑符号"),
     ]
 
     passed = 0
@@ -49,8 +57,7 @@ def test_unicode_to_latex():
         result = converter.fix_unicode_to_latex(input_text)
 
         # 使用正则表达式匹配（允许灵活匹配）
-        import re
-        if re.search(expected_pattern, result):
+        if expected_pattern.search(result):
             print(f"✓ 通过: {description}")
             print(f"  输入:  {input_text}")
             print(f"  输出:  {result}")
@@ -58,7 +65,7 @@ def test_unicode_to_latex():
         else:
             print(f"✗ 失败: {description}")
             print(f"  输入:     {input_text}")
-            print(f"  期望包含: {expected_pattern}")
+            print(f"  期望包含: {expected_pattern.pattern}")
             print(f"  实际输出: {result}")
             failed += 1
         print()
@@ -76,15 +83,14 @@ def test_latex_pattern_fixes():
     print("测试 LaTeX 格式修复")
     print("=" * 80)
 
-    config = {}
-    converter = FormulaConverter(config)
+    converter = _CONVERTER
 
     # 测试用例
     test_cases = [
-        # (输入, 期望输出中应包含的内容, 描述)
-        ("平均值 Ȳ", r"\bar{Y}", "组合字符上划线"),
-        ("$Y-$", r"\bar{Y}", "Y- → \\bar{Y}"),
-        ("$x-$", r"\bar{x}", "x- → \\bar{x}"),
+        # (输入, 期望输出中应匹配的正则（字面片段预编译）, 描述)
+        ("平均值 Ȳ", _expect(r"\bar{Y}"), "组合字符上划线"),
+        ("$Y-$", _expect(r"\bar{Y}"), "Y- → \\bar{Y}"),
+        ("$x-$", _expect(r"\bar{x}"), "x- → \\bar{x}"),
     ]
 
     passed = 0
@@ -93,8 +99,7 @@ def test_latex_pattern_fixes():
     for input_text, expected_pattern, description in test_cases:
         result = converter.fix_common_latex_patterns(input_text)
 
-        import re
-        if re.search(expected_pattern, result):
+        if expected_pattern.search(result):
             print(f"✓ 通过: {description}")
             print(f"  输入:  {input_text}")
             print(f"  输出:  {result}")
@@ -102,7 +107,7 @@ def test_latex_pattern_fixes():
         else:
             print(f"✗ 失败: {description}")
             print(f"  输入:     {input_text}")
-            print(f"  期望包含: {expected_pattern}")
+            print(f"  期望包含: {expected_pattern.pattern}")
             print(f"  实际输出: {result}")
             failed += 1
         print()
@@ -120,8 +125,7 @@ def test_full_post_process():
     print("测试完整后处理流程")
     print("=" * 80)
 
-    config = {}
-    converter = FormulaConverter(config)
+    converter = _CONVERTER
 
     # 模拟LLM可能返回的错误输出
     test_input = """
@@ -153,17 +157,16 @@ $$σ = √{\\frac{Σ(x_i-μ)^2}{n}}$$
 
     # 检查关键修复
     checks = [
-        (r"\\sum", "Σ → \\sum"),
-        (r"\\bar{Y}", "Ȳ → \\bar{Y}"),
-        (r"\\sigma", "σ → \\sigma"),
-        (r"\\sqrt", "√ → \\sqrt"),
-        (r"\\mu", "μ → \\mu"),
+        (_expect(r"\sum"), "Σ → \\sum"),
+        (_expect(r"\bar{Y}"), "Ȳ → \\bar{Y}"),
+        (_expect(r"\sigma"), "σ → \\sigma"),
+        (_expect(r"\sqrt"), "√ → \\sqrt"),
+        (_expect(r"\mu"), "μ → \\mu"),
     ]
 
     all_passed = True
     for pattern, description in checks:
-        import re
-        if re.search(pattern, result):
+        if pattern.search(result):
             print(f"✓ {description}")
         else:
             print(f"✗ {description} (未找到)")
@@ -9,10 +9,11 @@ import uuid
 import asyncio
 import logging
 from pathlib import Path
-from typing import List, Optional
+from typing import Dict, List, Optional
 from datetime import datetime
 from contextlib import asynccontextmanager
 
+from cachetools import TTLCache
 from fastapi import (
     BackgroundTasks,
     Depends,
@@ -115,7 +116,19 @@ app.add_middleware(
 ocr = AdvancedOCR()
 
 # 任务存储 (生产环境应使用数据库)
-tasks = {}
+# 有容量上限且按TTL过期，避免长期运行时任务记录无限增长；
+# 处理中的任务持有记录对象本身，过期只影响查询（返回404）
+TASK_CACHE_MAXSIZE = 10000
+TASK_TTL_SECONDS = 24 * 3600
+tasks = TTLCache(maxsize=TASK_CACHE_MAXSIZE, ttl=TASK_TTL_SECONDS)
+
+# 输出文件名 -> 所属用户，任务完成时登记，下载鉴权以此为准；
+# 不随任务记录过期，否则磁盘上仍存在的文件在任务被淘汰后会返回403。
+# 每个生成的文件只占一项，增长速度与 output 目录相同
+file_owners: Dict[str, str] = {}
+
+# 上传文件分块写盘的块大小（64KiB）
+UPLOAD_CHUNK_SIZE = 1 << 16
 
 
 class LoginRequest(BaseModel):
@@ -400,6 +413,13 @@ async def get_models():
     }
 
 
+async def save_upload_file(file: UploadFile, file_path: Path) -> None:
+    """分块读取上传文件并写入磁盘，内存中只保留一个块"""
+    with open(file_path, "wb") as f:
+        while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+            f.write(chunk)
+
+
 @app.post("/api/process")
 async def process_image(
     file: UploadFile = File(...),
@@ -430,9 +450,7 @@ async def process_image(
         upload_dir.mkdir(exist_ok=True)
 
         file_path = upload_dir / f"{task_id}_{file.filename}"
-        with open(file_path, "wb") as f:
-            content = await file.read()
-            f.write(content)
+        await save_upload_file(file, file_path)
 
         # 创建任务
         task = {
@@ -511,6 +529,7 @@ async def process_task(task_id: str):
                 "provider": result['analysis']['provider'],
                 "model": result['analysis']['model']
             }
+            file_owners[Path(result['output_path']).name] = task["user"]
         else:
             task["status"] = "failed"
             task["progress"] = 0
@@ -573,6 +592,7 @@ async def process_merged_task(task_id: str):
                 "model": result['analysis']['model'],
                 "images_processed": result.get('images_processed', 0)
             }
+            file_owners[Path(result['output_path']).name] = task["user"]
         else:
             task["status"] = "failed"
             task["progress"] = 0
@@ -633,17 +653,7 @@ async def download_file(filename: str, current_user: str = Depends(get_current_u
         raise HTTPException(status_code=404, detail="文件不存在")
 
     # Ensure the requested file belongs to the current user
-    allowed = False
-    for task in tasks.values():
-        if isinstance(task, dict) and task.get("user") == current_user:
-            result = task.get("result")
-            if result:
-                output_path = result.get("output_path")
-                if output_path and Path(output_path).name == filename:
-                    allowed = True
-                    break
-
-    if not allowed:
+    if file_owners.get(filename) != current_user:
         raise HTTPException(status_code=403, detail="无权下载该文件")
 
     return FileResponse(
@@ -684,9 +694,7 @@ async def batch_process(
             task_id = str(uuid.uuid4())
             file_path = upload_dir / f"{task_id}_{file.filename}"
 
-            with open(file_path, "wb") as f:
-                content = await file.read()
-                f.write(content)
+            await save_upload_file(file, file_path)
             file_paths.append(str(file_path))
 
         if merge_documents: